@@ -1,4 +1,5 @@
 from .clib import (
     rgba_to_rgb16,
-    rgb_to_rgb16
+    rgb_to_rgb16,
+    convert_region
 )
\ No newline at end of file
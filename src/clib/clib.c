@@ -57,9 +57,130 @@ static PyObject* rgb_to_rgb16(PyObject* self, PyObject* args) {
     return result;
 }
 
+// 4x4 ordered dither (Bayer) thresholds, 0..15
+static const unsigned char bayer4[4][4] = {
+    { 0,  8,  2, 10},
+    {12,  4, 14,  6},
+    { 3, 11,  1,  9},
+    {15,  7, 13,  5}
+};
+
+// add the dither threshold for a channel quantized to (8 - bits) bits
+static inline unsigned char dither_channel(unsigned char v, int threshold, int shift) {
+    int d = v + ((threshold << shift) >> 4);
+    return d > 255 ? 255 : (unsigned char)d;
+}
+
+enum { FMT_RGB565, FMT_BGR888, FMT_XRGB8888 };
+
+// Convert a sub-rectangle of an RGBA buffer straight into a framebuffer-like buffer.
+// The region is rotated (counter-clockwise, like PIL's Image.rotate) about its own
+// origin and written with its top-left corner at (dst_x, dst_y).
+// The dither pattern is keyed on destination pixels, so partial updates line up.
+static PyObject* convert_region(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = {"src", "src_width", "src_x", "src_y", "width", "height",
+                             "dst", "dst_stride", "dst_x", "dst_y",
+                             "rotate", "format", "dither", NULL};
+    Py_buffer src, dst;
+    int src_width, src_x, src_y, width, height;
+    Py_ssize_t dst_stride;
+    int dst_x, dst_y;
+    int rotate = 0;
+    const char *format = "RGB565";
+    int dither = 0;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "y*iiiiiw*nii|isp", kwlist,
+            &src, &src_width, &src_x, &src_y, &width, &height,
+            &dst, &dst_stride, &dst_x, &dst_y,
+            &rotate, &format, &dither)) {
+        return NULL;
+    }
+
+    int fmt, bpp;
+    if (strcmp(format, "RGB565") == 0) { fmt = FMT_RGB565; bpp = 2; }
+    else if (strcmp(format, "BGR888") == 0) { fmt = FMT_BGR888; bpp = 3; }
+    else if (strcmp(format, "XRGB8888") == 0) { fmt = FMT_XRGB8888; bpp = 4; }
+    else {
+        PyErr_Format(PyExc_ValueError, "Unsupported pixel format: %s", format);
+        goto error;
+    }
+    if (rotate != 0 && rotate != 90 && rotate != 180 && rotate != 270) {
+        PyErr_Format(PyExc_ValueError, "Invalid rotation angle: %d", rotate);
+        goto error;
+    }
+    if (width <= 0 || height <= 0) {
+        PyBuffer_Release(&src);
+        PyBuffer_Release(&dst);
+        Py_RETURN_NONE;
+    }
+    if (src_x < 0 || src_y < 0 || src_x + width > src_width ||
+        ((Py_ssize_t)(src_y + height - 1) * src_width + src_x + width) * 4 > src.len) {
+        PyErr_SetString(PyExc_ValueError, "Source region is outside the source buffer");
+        goto error;
+    }
+    // size of the region once rotated
+    int out_width = (rotate == 90 || rotate == 270) ? height : width;
+    int out_height = (rotate == 90 || rotate == 270) ? width : height;
+    if (dst_x < 0 || dst_y < 0 || (Py_ssize_t)(dst_x + out_width) * bpp > dst_stride ||
+        (Py_ssize_t)(dst_y + out_height - 1) * dst_stride + (Py_ssize_t)(dst_x + out_width) * bpp > dst.len) {
+        PyErr_SetString(PyExc_ValueError, "Destination region is outside the destination buffer");
+        goto error;
+    }
+
+    const unsigned char *in = (const unsigned char *)src.buf;
+    unsigned char *out = (unsigned char *)dst.buf;
+
+    Py_BEGIN_ALLOW_THREADS
+    for (int y = 0; y < height; ++y) {
+        const unsigned char *p = in + ((Py_ssize_t)(src_y + y) * src_width + src_x) * 4;
+        for (int x = 0; x < width; ++x, p += 4) {
+            int ox, oy;
+            switch (rotate) {
+                case 90:  ox = y;              oy = width - 1 - x;  break;
+                case 180: ox = width - 1 - x;  oy = height - 1 - y; break;
+                case 270: ox = height - 1 - y; oy = x;              break;
+                default:  ox = x;              oy = y;              break;
+            }
+            ox += dst_x;
+            oy += dst_y;
+            unsigned char r = p[0], g = p[1], b = p[2];
+            unsigned char *q = out + (Py_ssize_t)oy * dst_stride + (Py_ssize_t)ox * bpp;
+            if (fmt == FMT_RGB565) {
+                if (dither) {
+                    int t = bayer4[oy & 3][ox & 3];
+                    r = dither_channel(r, t, 3);
+                    g = dither_channel(g, t, 2);
+                    b = dither_channel(b, t, 3);
+                }
+                unsigned short v = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3);
+                q[0] = v & 0xFF;
+                q[1] = v >> 8;
+            } else if (fmt == FMT_BGR888) {
+                q[0] = b; q[1] = g; q[2] = r;
+            } else {
+                q[0] = b; q[1] = g; q[2] = r; q[3] = 0xFF;
+            }
+        }
+    }
+    Py_END_ALLOW_THREADS
+
+    PyBuffer_Release(&src);
+    PyBuffer_Release(&dst);
+    Py_RETURN_NONE;
+
+error:
+    PyBuffer_Release(&src);
+    PyBuffer_Release(&dst);
+    return NULL;
+}
+
 static PyMethodDef clib_methods[] = {
     {"rgba_to_rgb16", rgba_to_rgb16, METH_VARARGS, "Convert RGBA to RGB565"},
     {"rgb_to_rgb16", rgb_to_rgb16, METH_VARARGS, "Convert RGB to RGB565"},
+    {"convert_region", (PyCFunction)(void(*)(void))convert_region, METH_VARARGS | METH_KEYWORDS,
+        "convert_region(src, src_width, src_x, src_y, width, height, dst, dst_stride, dst_x, dst_y, rotate=0, format='RGB565', dither=False)\n"
+        "Convert a sub-rectangle of an RGBA buffer into a writable buffer (eg: an mmap'd framebuffer),\n"
+        "rotating by 0/90/180/270 degrees and optionally ordered-dithering RGB565."},
     {NULL, NULL, 0, NULL}
 };
 
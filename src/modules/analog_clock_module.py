@@ -1,7 +1,9 @@
 from datetime import datetime
+from PIL import Image, ImageDraw
 from pymirror.pmmodule import PMModule
 from pymirror.pmlogger import _debug
 import math
+import time
 
 def _compute_clock_positions(gfx, dx, dy, r):
 	"""Compute the 12 positions around a clock face given center (x0, y0) and radius r."""
@@ -37,7 +39,10 @@ class AnalogClockModule(PMModule):
 		self.second_hand = self._analog_clock.second_hand
 		self.minute_hand = self._analog_clock.minute_hand
 		self.hour_hand = self._analog_clock.hour_hand
-		self._render_clock_face()
+		## draw the hands this many times larger and scale them down (antialiasing), 1 = draw directly
+		self.supersample = max(1, int(self._analog_clock.supersample or 1))
+		self._dial = None  # the static face (circle + numerals), drawn once
+		self._dial_key = None  # what the dial was drawn with, it's redrawn when this changes
 		self.hour = 0
 		self.minute = 0
 		self.second = 0
@@ -56,43 +61,81 @@ class AnalogClockModule(PMModule):
 			hrs, rect = posn
 			self.bitmap.text_box(rect, hrs, valign="center", halign="center")
 
-	def render(self, force: bool = False) -> bool:
-		now = datetime.now()
-		self.bitmap.clear()
-		save_color = self.bitmap.gfx.color
+	def _draw_dial(self, dx, dy, r) -> None:
+		""" Draw the face on the bitmap if it changed, otherwise restore the cached one """
 		gfx = self.bitmap.gfx
-		dx = gfx.width/2
-		dy = gfx.height/2
-		if dx < dy: r = dx
-		else: r = dy
-
+		key = (self.bitmap.width, self.bitmap.height, gfx.bg_color, gfx.text_color, gfx.text_bg_color, gfx.font.name, gfx.font.pitch)
+		if self._dial and key == self._dial_key:
+			self.bitmap._img.paste(self._dial, (0, 0))
+			return
+		self.bitmap.clear()
 		self._render_clock_face(dx, dy, r)
+		self._dial = self.bitmap._img.copy()
+		self._dial_key = key
 
+	def _hands(self, now, dx, dy, r) -> list:
+		""" [(color, line width, (x0, y0, x1, y1))] of the hands to draw """
+		hands = []
 		if self.hour_hand is not None:
 			hr_posn = _compute_hand_posn(dx, dy, r*self.hour_length, now.hour + now.minute/60 + now.second/3600, 12.0, -3.0)
-			gfx.line_width = 10
-			gfx.color = self.hour_hand
-			self.bitmap.line((dx, dy, hr_posn[0], hr_posn[1]))
+			hands.append((self.hour_hand, 10, (dx, dy, hr_posn[0], hr_posn[1])))
 			self.last_hour = now.hour
-
 		if self.minute_hand is not None:
 			min_posn = _compute_hand_posn(dx, dy, r*self.minute_length, now.minute + now.second/60, 60.0, -15.0)
-			gfx.line_width = 5
-			gfx.color = self.minute_hand
-			self.bitmap.line((dx, dy, min_posn[0], min_posn[1]))
+			hands.append((self.minute_hand, 5, (dx, dy, min_posn[0], min_posn[1])))
 			self.last_minute = now.minute
-
 		if self.second_hand is not None:
 			sec_posn = _compute_hand_posn(dx, dy, r*self.second_length, now.second, 60.0, -15.0)
-			gfx.line_width = 3
-			gfx.color = self.second_hand
-			self.bitmap.line((dx, dy, sec_posn[0], sec_posn[1]))
+			hands.append((self.second_hand, 3, (dx, dy, sec_posn[0], sec_posn[1])))
 			self.last_second = now.second
+		return hands
+
+	def _draw_hands_supersampled(self, hands) -> None:
+		## draw on a transparent layer s times the size of the hands' bounding box,
+		## then scale it down over the dial
+		if not hands: return
+		s = self.supersample
+		img = self.bitmap._img
+		pad = max(line_width for _color, line_width, _rect in hands)
+		bx0 = max(0, int(min(min(rect[0], rect[2]) for _color, _width, rect in hands)) - pad)
+		by0 = max(0, int(min(min(rect[1], rect[3]) for _color, _width, rect in hands)) - pad)
+		bx1 = min(img.width, int(max(max(rect[0], rect[2]) for _color, _width, rect in hands)) + pad + 1)
+		by1 = min(img.height, int(max(max(rect[1], rect[3]) for _color, _width, rect in hands)) + pad + 1)
+		layer = Image.new("RGBA", ((bx1 - bx0) * s, (by1 - by0) * s), (0, 0, 0, 0))
+		draw = ImageDraw.Draw(layer)
+		for color, line_width, (x0, y0, x1, y1) in hands:
+			draw.line(((x0 - bx0) * s, (y0 - by0) * s, (x1 - bx0) * s, (y1 - by0) * s), fill=color, width=line_width * s)
+		layer = layer.resize((bx1 - bx0, by1 - by0), Image.Resampling.BOX)
+		img.alpha_composite(layer, (bx0, by0))
+
+	def render(self, force: bool = False) -> bool:
+		now = datetime.now()
+		save_color = self.bitmap.gfx.color
+		gfx = self.bitmap.gfx
+		dx = self.bitmap.width/2
+		dy = self.bitmap.height/2
+		if dx < dy: r = dx
+		else: r = dy
+
+		self._draw_dial(dx, dy, r)
+
+		hands = self._hands(now, dx, dy, r)
+		if self.supersample > 1:
+			self._draw_hands_supersampled(hands)
+		else:
+			for color, line_width, rect in hands:
+				gfx.line_width = line_width
+				gfx.color = color
+				self.bitmap.line(rect)
 
 		self.bitmap.gfx.color = save_color
 		_debug("analog_clock", now)
 		return True
 
+	def next_wakeup(self) -> float:
+		## the next whole second
+		return math.floor(time.time()) + 1
+
 	def exec(self) -> bool:
 		now = datetime.now()
 		return \
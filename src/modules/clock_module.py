@@ -1,4 +1,6 @@
 from datetime import datetime
+import math
+import time
 from pymirror.pmmodule import PMModule
 from pymirror.utils import SafeNamespace
 
@@ -20,6 +22,10 @@ class ClockModule(PMModule):
 		self.last_time = self.curr_time
 		return True
 
+	def next_wakeup(self) -> float:
+		## the next whole second
+		return math.floor(time.time()) + 1
+
 	def exec(self) -> bool:
 		# if date_format includes "%W" or "%U", update the week number
 		# all this ceremony because %W and %U are zero-based and we must add 1 to them
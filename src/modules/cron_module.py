@@ -1,3 +1,5 @@
+import math
+import time
 from pymirror.crontab import Crontab
 from pymirror.pmmodule import PMModule
 from pymirror.pmlogger import _debug
@@ -15,6 +17,10 @@ class CronModule(PMModule):
 	def render(self, force: bool = False) -> bool:
 		pass
 
+	def next_wakeup(self) -> float:
+		## crontabs have a resolution of one second
+		return math.floor(time.time()) + 1
+
 	def exec(self):
 		alert_indexes = self.crontab.check()
 		if not alert_indexes:
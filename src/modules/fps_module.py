@@ -1,4 +1,5 @@
 from datetime import datetime
+import time
 from pymirror.pmmodule import PMModule
 
 class FpsModule(PMModule):
@@ -16,6 +17,10 @@ class FpsModule(PMModule):
 		self.bitmap.text_box((0, 0, self.bitmap.width-1, self.bitmap.height-1), f"FPS: {fps:.2f}", valign=self._fps.valign, halign=self._fps.halign)
 		return True
 
+	def next_wakeup(self) -> float:
+		## runs on every loop
+		return time.time()
+
 	def exec(self):
 		return True
 
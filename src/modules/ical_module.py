@@ -29,6 +29,8 @@ class IcalModule(PMCard):
         self.timer.set_timeout(self._ical.refresh_minutes * 60 * 1000)
         self.ical_response = None
         self.api = PMWebApi(self._ical.url, self._ical.refresh_minutes * 60, self._ical.cache_file)
+        self._fresh = False  # set by the api (on the I/O thread) when new data arrives
+        self.api.subscribe(self._on_fresh_data)
         self.all_day_format = strftime_by_example(self._ical.all_day_format)
         self.time_format = strftime_by_example(self._ical.time_format)
 
@@ -114,9 +116,13 @@ class IcalModule(PMCard):
                     dates.append(event.begin + timedelta(weeks=i))
         return dates
 
+    def _on_fresh_data(self, api) -> None:
+        self._fresh = True
+
     def exec(self) -> bool:
         is_dirty = super().exec()
-        if not self.timer.is_timedout(): return is_dirty # early exit if not timed out
+        if not self.timer.is_timedout() and not self._fresh: return is_dirty # early exit if not timed out
+        self._fresh = False
         self.timer.reset()
 
         self.ical_response = self.api.fetch_text(blocking=False)
@@ -129,7 +135,7 @@ class IcalModule(PMCard):
                 "(loading...)",
                 datetime.now().astimezone().strftime("%Y-%m-%d %H:%M:%S"),
             )
-            self.timer.reset(1000)
+            self.timer.reset(max(1000, self.api.retry_in_secs() * 1000))
             return False
         print("got data...")
         epoch = datetime(1980, 1, 1, tzinfo=timezone.utc)
@@ -1,4 +1,5 @@
 from datetime import datetime
+import time
 from pymirror.pmmodule import PMModule
 from pymirror.pmscreen import PMGfx
 from pymirror.pmlogger import _debug, _trace
@@ -38,6 +39,10 @@ class RainbowModule(PMModule):
 			x = int(dx)
 		return True
 
+	def next_wakeup(self) -> float:
+		## runs on every loop
+		return time.time()
+
 	def exec(self):
 		_debug(f"Rainbow module exec at {datetime.now()}")
 		if self.first_time:
@@ -1,19 +1,30 @@
 from random import random, randint, choice  # Import the functions you need
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from modules.photo_module import PhotoModule
 from pymirror.pmmodule import PMModule
 from pymirror.pmtimer import PMTimer
+from pymirror.pmcaches import ImageCache, ThumbnailCache
+from pymirror.pmwatcher import PMWatcher, IMAGE_EXTENSIONS
 from pymirror.utils import SafeNamespace, _height, _str_to_rect, _width
 from pmgfxlib.pmbitmap import PMBitmap
-from pymirror.pmlogger import _debug
+from pmgfxlib.pmtransition import PMTransition
+from pymirror.pmlogger import _debug, _error
 from pymirror.pmrect import PMRect
 import os
+import threading
 
 class SlideshowModule(PMModule):
 	def __init__(self, pm, config: SafeNamespace):
 		super().__init__(pm, config)
 		self._slideshow = config.slideshow
 		self.alt_rect = PMRect(*_str_to_rect(self._slideshow.rect))
+		self.extensions = tuple(self._slideshow.extensions or IMAGE_EXTENSIONS)
 		self.photo_number = 0
+		self._thumbs = None  # pre-scaled photos on disk (slideshow.cache_dir)
+		if self._slideshow.cache_dir:
+			self._thumbs = ThumbnailCache(self._slideshow.cache_dir, *self._image_size(), self._slideshow.scale, self.extensions)
 		self.photos = self.load_folder(self._slideshow.folder)
 		self.timer = PMTimer(self._slideshow.interval_secs * 1000)
 		self.dirty = False
@@ -22,35 +33,182 @@ class SlideshowModule(PMModule):
 		if self._slideshow.frame:
 			self.frame_bm = PMBitmap().load(self._slideshow.frame)
 			self.frame_bm.scale(self.bitmap.width, self.bitmap.height, "stretch")
+		## the next photos are picked ahead of time, and decoded + scaled in the background
+		self.prefetch = max(1, self._slideshow.prefetch or 3)
+		self._upcoming = deque()  # paths of the photos to show next
+		self._loading = {}  # path -> Future of the decoded bitmap
+		self._failed = set()  # paths that couldn't be decoded, skipped until the file changes
+		self._cache = ImageCache(int((self._slideshow.cache_mb or 64) * 1024 * 1024))
+		self._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pm-slideshow")
+		self._waiting = False  # the timer is up, but the next photo isn't decoded yet
+		## blend from the old photo to the new one (slideshow.transition: crossfade, wipe or none)
+		self._transition = None
+		if self._slideshow.transition:
+			self._transition = PMTransition(self._slideshow.transition, self._slideshow.transition_secs or 1.0, self._slideshow.transition_fps or 20)
+		self._shown = None  # the path on the bitmap now
+		## keep the photo list up to date as files are added / removed (slideshow.watch, on by default)
+		self._folder_changes = []  # (added, removed) from the watcher thread
+		self._folder_lock = threading.Lock()
+		self._watcher = None
+		if self._slideshow.watch is not False:
+			self._watcher = PMWatcher(self._slideshow.folder, self._on_folder_change, self.extensions).start()
+		self._prefetch()
 
 	def load_folder(self, folder: str):
 		""" Load all photo paths from the given folder """
+		if self._thumbs:
+			paths = self._thumbs.list_photos(folder)
+			_debug(f"Loaded {len(paths)} photos from {folder}")
+			return paths
 		paths = []
-		for photo_path in os.listdir(folder):
+		for photo_path in sorted(os.listdir(folder)):
+			if os.path.splitext(photo_path)[1].lower() not in self.extensions: continue
 			path = os.path.join(folder, photo_path)
 			paths.append(path)
 		_debug(f"Loaded {len(paths)} photos from {folder}")
 		return paths
 
+	def _on_folder_change(self, added: list[str], removed: list[str]) -> None:
+		## watcher thread: hand the changes to exec()
+		with self._folder_lock:
+			self._folder_changes.append((added, removed))
+		self.pm.wakeup()
+
+	def _apply_folder_changes(self) -> None:
+		with self._folder_lock:
+			changes, self._folder_changes = self._folder_changes, []
+		if not changes: return
+		photos = set(self.photos)
+		for added, removed in changes:
+			if self._thumbs:
+				self._thumbs.update(added, removed)
+			for path in removed:
+				photos.discard(path)
+				self._failed.discard(path)
+				self._cache.invalidate(path)
+				if path in self._upcoming:
+					self._upcoming.remove(path)
+			for path in added:
+				photos.add(path)
+				self._failed.discard(path)  # give a rewritten file another chance
+				self._cache.invalidate(path)  # it may have been replaced
+		self.photos = sorted(photos)
+		_debug(f"Slideshow folder changed, {len(self.photos)} photos")
+		if self.path in photos:
+			self.photo_number = self.photos.index(self.path)
+		elif self.path:
+			## the photo on screen is gone, keep its bitmap and move on to the next one now
+			self.photo_number = bisect_left(self.photos, self.path) - 1
+			self.path = None
+			self._waiting = True
+
+	def _image_size(self) -> tuple[int, int]:
+		return int(self.bitmap.width * _width(self.alt_rect)), int(self.bitmap.height * _height(self.alt_rect))
+
+	def _load_photo(self, path: str) -> PMBitmap:
+		if self._thumbs:
+			return self._thumbs.load(path)
+		img_width, img_height = self._image_size()
+		return PMBitmap().load(path, img_width, img_height, self._slideshow.scale, draft=True)
+
+	def _pick_next(self, photo_number: int) -> int:
+		if self._slideshow.randomize:
+			return randint(0, len(self.photos) - 1)
+		return (photo_number + 1) % len(self.photos)
+
+	def _prefetch(self) -> None:
+		""" Pick the upcoming photos and start decoding the ones that aren't cached """
+		if len(self._failed) >= len(self.photos): return  # nothing left that can be shown
+		last = self.photos.index(self._upcoming[-1]) if self._upcoming else self.photo_number
+		while len(self._upcoming) < self.prefetch:
+			last = self._pick_next(last)
+			if self.photos[last] in self._failed: continue
+			self._upcoming.append(self.photos[last])
+		for path in self._upcoming:
+			if path in self._cache or path in self._loading: continue
+			future = self._loader.submit(self._load_photo, path)
+			future.add_done_callback(lambda future: self.pm.wakeup())
+			self._loading[path] = future
+
+	def _is_ready(self, path: str) -> bool:
+		""" True once the photo is in the cache, moves finished decodes into the cache """
+		future = self._loading.get(path)
+		if future and future.done():
+			del self._loading[path]
+			try:
+				self._cache.set(path, future.result())
+			except Exception as e:
+				_error(f"Slideshow can't load {path}: {e}")
+				self._failed.add(path)
+				self._upcoming = deque(p for p in self._upcoming if p != path)  # skip it
+				return False
+		return path in self._cache
+
+	def _render_transition(self) -> None:
+		self.bitmap._img.paste(self._transition.frame(), (0, 0))
+		self.dirty = False
+
 	def render(self, force: bool = False) -> bool:
-		img_width, img_height = int(self.bitmap.width * _width(self.alt_rect)), int(self.bitmap.height * _height(self.alt_rect))
-		img_bm = PMBitmap().load(self.photos[self.photo_number], img_width, img_height, self._slideshow.scale)
+		if not self.path: return False
+		if self._transition and self._transition.active and self.path == self._shown:
+			self._render_transition()
+			return False
+		img_bm = self._cache.get(self.path)
+		if not img_bm:
+			## evicted, decode it here
+			try:
+				img_bm = self._load_photo(self.path)
+			except Exception as e:
+				## keep the current bitmap, exec() picks another photo
+				_error(f"Slideshow can't load {self.path}: {e}")
+				self._failed.add(self.path)
+				self.path = None
+				self._waiting = True
+				self.dirty = False
+				self.pm.wakeup()
+				return False
+			self._cache.set(self.path, img_bm)
 		new_x0 = (self.bitmap.width - img_bm.width) // 2
 		new_y0 = (self.bitmap.height - img_bm.height) // 2
+		old_img = self.bitmap._img.copy() if self._transition and self._shown and self.path != self._shown else None
 		self.bitmap.clear()
 		self.bitmap.paste(img_bm, new_x0, new_y0, img_bm)
 		if self.frame_bm:
 			self.bitmap.paste(self.frame_bm, 0, 0, self.frame_bm) ## overlay the frame
+		self._shown = self.path
 		self.dirty = False
+		if old_img:
+			## start from the old photo, exec() asks for the next frames
+			self._transition.start(old_img, self.bitmap._img.copy())
+			self._render_transition()
 		return False
-	
+
+	def next_wakeup(self) -> float:
+		if self._transition and self._transition.active:
+			return self._transition.next_frame_time()  # capped at transition_fps
+		if self._waiting:
+			return None  # the loader calls pm.wakeup() when a photo is decoded
+		return super().next_wakeup()
+
 	def exec(self):
-		if self.timer.is_timedout():
-			self.timer.reset()
-			if self._slideshow.randomize:
-				self.photo_number = randint(0, len(self.photos) - 1)
-			else:
-				self.photo_number = (self.photo_number + 1) % len(self.photos)
+		self._apply_folder_changes()
+		if self._transition and self._transition.is_frame_due():
 			self.dirty = True
+		if self._waiting or self.timer.is_timedout():
+			self._prefetch()
+			## only switch once the next photo is decoded, so render() is just a paste
+			while self._upcoming:
+				path = self._upcoming[0]
+				if self._is_ready(path): break
+				if path in self._loading:
+					self._waiting = True
+					return self.dirty
+				self._prefetch()  # a photo failed to load (or was evicted), pick another
+			self._waiting = False
+			self.timer.reset()
+			if self._upcoming:
+				self.path = self._upcoming.popleft()
+				self.photo_number = self.photos.index(self.path)
+				self.dirty = True
+				self._prefetch()
 		return self.dirty
-
@@ -45,10 +45,23 @@ class AccuWeatherApi(PMWebApi):
     """
     def __init__(self, config: SafeNamespace):
         self.config = AccuWeatherConfig()
-        super().__init__(self.config.url, self.config.cache_file, self.config.cache_timeout_secs)
+        super().__init__(self.config.url, self.config.cache_timeout_secs, self.config.cache_file)
         _debug(f"AccuWeatherApi initialized with params: {config}")
         self.params = AccuWeatherParams(**config.__dict__)
         self.location_key = None
+        self.location_data = None
+        self.forecast_data = None
+        ## kept for the life of the module, so their caches and refreshes carry over between calls
+        location_config = AccuWeatherLocationConfig()
+        self.location_api = PMWebApi(location_config.url, location_config.cache_timeout_secs, location_config.cache_file)
+        forecast_config = AccuWeatherForecastConfig()
+        self.forecast_api = PMWebApi(forecast_config.url, forecast_config.cache_timeout_secs, forecast_config.cache_file)
+
+    def subscribe(self, callback) -> None:
+        """ fresh current conditions, forecast or location all change the weather """
+        super().subscribe(callback)
+        self.location_api.subscribe(callback)
+        self.forecast_api.subscribe(callback)
 
     def _to_daily(self, r, f, d):        
         return {
@@ -86,8 +99,9 @@ class AccuWeatherApi(PMWebApi):
         Fetches weather data from the AccuWeather API.
         If params are provided, they will be used in the request.
         """
-        self.get_location_data() ## get the location key if not already set
-        self.get_forecast_data() ## get the forecast data if not already set
+        ## the location and forecast come from their own apis, None until they've arrived
+        if not self.get_location_data(): return None
+        if not self.get_forecast_data(): return None
         params = {
             "_resource_id": self.location_key,
             "apikey": self.params.apikey,
@@ -128,29 +142,27 @@ class AccuWeatherApi(PMWebApi):
 
     def get_location_data(self) -> str:
         if self.location_key: return self.location_key
-        config = AccuWeatherLocationConfig()
-        location_api = PMWebApi(config.url, config.cache_file, config.cache_timeout_secs)
-        location_data = location_api.get_json({
+        location_data = self.location_api.get_json({
             "apikey": self.params.apikey,
             "q": f"{self.params.lat},{self.params.lon}",
             "details": "false",
             "toplevel": "false"
         })
+        if not location_data: return None
         self.location_data = SafeNamespace(**location_data)
         self.location_key = location_data["Key"]
         _debug(f"AccuWeather location key: {self.location_key}")
         return self.location_key
 
     def get_forecast_data(self) -> str:
-        config = AccuWeatherForecastConfig()
-        forecast_api = PMWebApi(config.url, config.cache_file, config.cache_timeout_secs)
-        forecast_data = forecast_api.get_json({
+        forecast_data = self.forecast_api.get_json({
             "_resource_id": self.location_key,
             "apikey": self.params.apikey,
             "details": True,
             "language": self.params.language,
             "metric": self.params.units.lower() == "metric"
         })
+        if not forecast_data: return None
         self.forecast_data = SafeNamespace(**forecast_data)
         _debug(f"AccuWeather forecast_data: {self.forecast_data}")
         return self.forecast_data
\ No newline at end of file
@@ -25,10 +25,16 @@ class WeatherModule(PMCard):
         elif config.accuweather:
             from .weather_apis.accuweather import AccuWeatherApi
             self.api = AccuWeatherApi(config.accuweather)
+        self._fresh = False  # set by the api (on the I/O thread) when new data arrives
+        self.api.subscribe(self._on_fresh_data)
+
+    def _on_fresh_data(self, api) -> None:
+        self._fresh = True
 
     def exec(self) -> bool:
         is_dirty = super().exec()
-        if not self.timer.is_timedout(): return is_dirty # early exit if not timed out
+        if not self.timer.is_timedout() and not self._fresh: return is_dirty # early exit if not timed out
+        self._fresh = False
 
         self.weather_response = self.api.get_weather_data()
         if not self.weather_response:
@@ -37,7 +43,8 @@ class WeatherModule(PMCard):
                 "(loading...)",
                 "",
             )
-            self.timer.reset(100)
+            ## poll until it arrives, slower while the provider is backing off
+            self.timer.reset(max(100, self.api.retry_in_secs() * 1000))
             return False
         else:
             self.timer.reset()
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+import time
 import requests
 import copy
 
@@ -12,7 +13,12 @@ class WebApiModule(PMCard):
 	def __init__(self, pm, config):
 		super().__init__(pm, config)
 		self._web_api = config.web_api
-		self.api = PMWebApi(self._web_api.url, self._web_api.poll_secs, self._web_api.cache_file)
+		## web_api.stream: write large payloads straight to the cache file
+		## web_api.paths: only keep the parts the display uses, eg: ["articles[*].title", "totalResults"]
+		self.api = PMWebApi(self._web_api.url, self._web_api.poll_secs, self._web_api.cache_file, stream=bool(self._web_api.stream))
+		self.paths = list(self._web_api.paths or []) or None
+		self._fresh = False  # set by the api (on the I/O thread) when new data arrives
+		self.api.subscribe(self._on_fresh_data)
 		self.display_timer = PMTimer(self._web_api.cycle_seconds * 1000)
 
 		self.response = None
@@ -44,9 +50,12 @@ class WebApiModule(PMCard):
 			self.items.append(display)
 		return len(self.items)
 	
+	def _on_fresh_data(self, api) -> None:
+		self._fresh = True
+
 	def _read_api(self):
 		self.api.httpx.params = self._web_api.params.__dict__
-		self.response = self.api.fetch_json(blocking=False)
+		self.response = self.api.fetch_json(blocking=False, paths=self.paths)
 		if not self.response:
 			_error(f"Error fetching data")
 			return False
@@ -68,10 +77,18 @@ class WebApiModule(PMCard):
 		self.update(self.header, self.body, self.footer)
 		self.item_number += 1
 	
+	def next_wakeup(self) -> float:
+		if self.api.is_pending():
+			return None  # the main loop is woken up when the fetch finishes
+		if self.response == None:
+			return time.time() + max(0.1, self.api.retry_in_secs())  # poll until the first response arrives
+		return self.display_timer.future_time
+
 	def exec(self) -> bool:
 		update = super().exec()
 
-		if self.response == None or self.display_timer.is_timedout():
+		if self.response == None or self._fresh or self.display_timer.is_timedout():
+			self._fresh = False
 			self.result = self._read_api()
 			self._display_next_item()
 			self.display_timer.reset()
@@ -16,6 +16,7 @@ from pymirror.pmrect import PMRect
 from pymirror.pmlogger import _trace, _debug
 from pymirror.utils import SafeNamespace, non_null
 from .pmgfx import PMGfx
+from .pmtextcache import TEXT_CACHE
 
 CENTER = 0
 BOTTOM = 1
@@ -79,9 +80,13 @@ class PMBitmap:
     def height(self, value: int):
         self._rect.height = value
 
-    def load(self, photo_path, width=None, height=None, scale=None) -> "PMBitmap":
+    def load(self, photo_path, width=None, height=None, scale=None, draft=False) -> "PMBitmap":
         _trace("...Loading bitmap from", photo_path)
-        self._img = Image.open(photo_path).convert(
+        img = Image.open(photo_path)
+        if draft and width and height:
+            ## let the JPEG decoder downscale (1/2, 1/4, 1/8) to no smaller than the target size
+            img.draft("RGB", (width, height))
+        self._img = img.convert(
             "RGBA"
         )  # Ensure the image is in RGBA format
         self._draw = ImageDraw.Draw(self._img)
@@ -109,10 +114,11 @@ class PMBitmap:
         self.gfx = self._gfx_stack.pop()
         return self.gfx
 
-    def clear(self) -> None:
-        self._draw.rectangle(
-            (0, 0, self._img.width, self._img.height), fill=self.gfx.bg_color
-        )
+    def clear(self, rect: PMRect = None) -> None:
+        ## rect limits the clear to part of the bitmap (eg: a damaged screen region)
+        if rect is None:
+            rect = (0, 0, self._img.width, self._img.height)
+        self._draw.rectangle(tuple(rect), fill=self.gfx.bg_color)
 
     def line(self, rect: tuple):
         self._draw.line(rect, fill=self.gfx.color, width=self.gfx.line_width)
@@ -151,15 +157,20 @@ class PMBitmap:
                 rect, outline=self.gfx.color, width=self.gfx.line_width, fill=fill
             )
 
+    def _draw_text(self, xy: tuple, msg: str, fill) -> None:
+        font = self.gfx.font
+        if fill is None or "\n" in msg:
+            ## not cacheable (default ink / multiline layout)
+            with font.lock:
+                self._draw.text(xy, msg, font=font._font, fill=fill)
+        else:
+            TEXT_CACHE.draw(self._draw, xy, msg, font, fill)
+
     def text(self, msg: str, x0: int, y0: int, fill=-1) -> None:
         if fill == -1:
             # Use the gfx.background color if specified
-            self._draw.text(
-                (x0, y0), msg, font=self.gfx.font._font, fill=self.gfx._text_color
-            )
-        else:
-            # Use the specified fill color
-            self._draw.text((x0, y0), msg, font=self.gfx.font._font, fill=fill)
+            fill = self.gfx._text_color
+        self._draw_text((x0, y0), msg, fill)
 
     def calculate_text_box(self, lines: str) -> tuple[str, tuple[int, int]]:
         """Calculate the size of the text."""
@@ -233,20 +244,29 @@ class PMBitmap:
                     _debug(
                         f"Invalid halign '{type(halign), halign}' in text_box, using 'center' instead."
                     )
-                self._draw.text(
-                    (text_x0, text_y0 - baseline),
-                    line,
-                    fill=(gfx._text_color),
-                    font=gfx.font._font,
-                )
+                self._draw_text((text_x0, text_y0 - baseline), line, gfx._text_color)
                 text_y0 += font_height
 
-    def paste(self, src: "PMBitmap", x0=None, y0=None, mask: "PMBitmap" = None) -> None:
+    def paste(self, src: "PMBitmap", x0=None, y0=None, mask: "PMBitmap" = None, clip: PMRect = None) -> None:
         if x0 == None:
             x0 = src.gfx.x0
         if y0 == None:
             y0 = src.gfx.y0
-        self._img.paste(src._img, (x0, y0), mask and mask._img)
+        if clip is None:
+            self._img.paste(src._img, (x0, y0), mask and mask._img)
+            return
+        ## only paste the part of src that falls inside clip (in this bitmap's coordinates)
+        src_rect = PMRect(x0, y0, x0 + src._img.width - 1, y0 + src._img.height - 1)
+        area = src_rect.intersection(clip)
+        if not area:
+            return
+        box = (area.x0 - x0, area.y0 - y0, area.x1 - x0 + 1, area.y1 - y0 + 1)
+        img = src._img.crop(box)
+        if mask is src:
+            mask_img = img
+        else:
+            mask_img = mask and mask._img.crop(box)
+        self._img.paste(img, (area.x0, area.y0), mask_img)
 
     def scale_to_fit(self, target_width, target_height):
         """Scale image to fit within bounds, maintaining aspect ratio"""
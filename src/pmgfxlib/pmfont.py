@@ -1,14 +1,27 @@
-from dataclasses import dataclass
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from typing import ClassVar, Optional
 from PIL import ImageFont
 from pymirror.utils import _height, _width
 from pymirror.pmlogger import trace, _debug
 
+WORD_WIDTHS_SIZE = 20000  # cached word widths per font (the cache is reset when it's full)
+WRAPPED_SIZE = 512  # wrapped texts kept in the LRU
+
 @dataclass
 class PMFont:
     ## Class variables
     FONT_LIST: ClassVar[Optional[list]] = None
     FONT_LIST_FNAME: ClassVar[str] = "./fontlist.txt"
+    ## process-wide font pool, shared by every PMFont
+    _FONT_INDEX: ClassVar[dict] = {}  # stem / file name / path -> font path
+    _RESOLVED: ClassVar[dict] = {}  # font name -> font path (or None), memoized lookups
+    _POOL: ClassVar[dict] = {}  # (font path, size) -> (FreeTypeFont, lock, metrics)
+    _POOL_LOCK: ClassVar[threading.Lock] = threading.Lock()
+    _WORD_WIDTHS: ClassVar[dict] = {}  # (font path, size) -> {word: advance width}
+    _WRAPPED: ClassVar[OrderedDict] = OrderedDict()  # (font path, size, text, width, height, split) -> lines
 
     ## instance variables
     _name: str = "DejaVuSans"  # default font name
@@ -16,6 +29,9 @@ class PMFont:
     _antialias: bool = True
     _font: Optional[ImageFont.FreeTypeFont] = None
     _font_metrics: tuple = (0, 0, 0, 0)  # (offset, baseline, width, height)
+    ## FreeType faces are not thread-safe, hold the lock while measuring or drawing with _font
+    ## (the lock belongs to the pooled FreeTypeFont, so it's shared by every PMFont using it)
+    _lock: threading.RLock = field(default_factory=threading.RLock, repr=False, compare=False)
 
     def __post_init__(self):
         if not PMFont.FONT_LIST:
@@ -51,6 +67,10 @@ class PMFont:
     def metrics(self) -> tuple:
         return self._font_metrics
 
+    @property
+    def lock(self) -> threading.RLock:
+        return self._lock
+
     def _read_fontlist(self, font_list_fname: str = None) -> None:
         if PMFont.FONT_LIST: return
         if not font_list_fname:
@@ -71,66 +91,122 @@ class PMFont:
                 font_list.append(font_path)
         return font_list
 
+    @classmethod
+    def _build_index(cls) -> None:
+        ## the first font in the list wins, like the substring search did
+        for font_path in cls.FONT_LIST:
+            file_name = os.path.basename(font_path)
+            for key in (font_path, file_name, os.path.splitext(file_name)[0]):
+                cls._FONT_INDEX.setdefault(key, font_path)
+
+    @classmethod
+    def resolve(cls, font_name: str) -> str | None:
+        """ The path of a font name: exact match on the stem, file name or path, else the first path containing it """
+        with cls._POOL_LOCK:
+            if font_name in cls._RESOLVED:
+                return cls._RESOLVED[font_name]
+            if not cls._FONT_INDEX:
+                cls._build_index()
+            font_path = cls._FONT_INDEX.get(font_name)
+            if not font_path:
+                font_path = next((path for path in cls.FONT_LIST if font_name in path), None)
+            cls._RESOLVED[font_name] = font_path
+            return font_path
+
+    @classmethod
+    def _load(cls, font_path: str, size: int) -> tuple:
+        """ returns the pooled (FreeTypeFont, lock, metrics) for the font path and size """
+        key = (font_path, size)
+        with cls._POOL_LOCK:
+            entry = cls._POOL.get(key)
+            if not entry:
+                font = ImageFont.truetype(font_path, size=size)
+                entry = cls._POOL[key] = (font, threading.RLock(), font.getbbox("M"))
+                _debug(f"Loaded font {font_path} ({size}), {len(cls._POOL)} fonts in the pool")
+            return entry
+
     def set_font(self, font_name: str, pitch: int = 64) -> bool:
         if not pitch:
             pitch = self._pitch
         if not font_name:
             font_name = self._name
-        for font_path in PMFont.FONT_LIST:
-            try:
-                if font_name in font_path:
-                    self._name = font_name
-                    self._pitch = int(pitch)
-                    self._font = ImageFont.truetype(font_path, size=self._pitch)
-                    self._font_metrics = self._font.getbbox("M")
-                    return True  # successfully set the font
-            except Exception as e:
-                _debug(f"Error setting font '{font_path}': {e}")
-        return False
+        font_path = PMFont.resolve(font_name)
+        if not font_path:
+            _debug(f"Font '{font_name}' is not in {PMFont.FONT_LIST_FNAME}")
+            return False
+        try:
+            self._font, self._lock, self._font_metrics = PMFont._load(font_path, int(pitch))
+        except Exception as e:
+            _debug(f"Error setting font '{font_path}': {e}")
+            return False
+        self._name = font_name
+        self._pitch = int(pitch)
+        return True  # successfully set the font
 
     def getbbox(self, text: str) -> tuple:
         """Get the bounding box of the text."""
         if not self._font:
             raise ValueError("Font not set. Call set_font() first.")
-        return self._font.getbbox(text)
+        with self._lock:
+            return self._font.getbbox(text)
+
+    def _text_width(self, text: str) -> int:
+        """ right edge of the text's bounding box, what the wrap functions compare to the rect width """
+        return self.getbbox(text)[2]
+
+    def _word_width(self, word: str) -> float:
+        """ cached advance width of a word """
+        widths = PMFont._WORD_WIDTHS.setdefault((self._font.path, self._pitch), {})
+        width = widths.get(word)
+        if width is None:
+            if len(widths) >= WORD_WIDTHS_SIZE:
+                widths.clear()
+            with self._lock:
+                width = widths[word] = self._font.getlength(word)
+        return width
 
     def fit_text_chars(self, msg: str, rect: tuple) -> int:
-        n = 0
-        last_n = 0
-        max = len(msg)
-        while True:
-            if n >= max: return n
-            last_n = n
-            width = self._font.getbbox(msg[:n])[2]  # Get width of the text
-            if width > _width(rect):
-                return last_n
-            n += 1
+        """ The number of characters of msg that fit in the rect width (at least 1, so wrapping always advances) """
+        max_width = _width(rect)
+        if not msg or self._text_width(msg) <= max_width:
+            return len(msg)
+        ## binary search for the longest prefix that fits
+        lo, hi = 1, len(msg) - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self._text_width(msg[:mid]) <= max_width:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
 
     def fit_text_words(self, words: list[str], rect: tuple) -> int:
-        n = 0
-        last_n = 0
-        max = len(words)
-        while True:
-            if n > max: return n
-            test_words = words[:n]
-            test_line = " ".join(test_words)
-            width = self._font.getbbox(test_line)[2]  # Get width of the text
-            if width >= _width(rect): return last_n
-            last_n = n
+        """ The number of words that fit on a line in the rect width (at least 1, so wrapping always advances) """
+        max_width = _width(rect)
+        if not words: return 0
+        ## greedy pass over the cached word widths...
+        space = self._word_width(" ")
+        n = 1
+        width = self._word_width(words[0])
+        while n < len(words):
+            width += space + self._word_width(words[n])
+            if width >= max_width: break
+            n += 1
+        ## ...then correct it with the real (kerned) width of the line
+        while n > 1 and self._text_width(" ".join(words[:n])) >= max_width:
+            n -= 1
+        while n < len(words) and self._text_width(" ".join(words[:n + 1])) < max_width:
             n += 1
+        return n
 
     def text_split_words(self, s, rect: tuple) -> list[str]:
         words = s.split()
         n = 0
-        end = len(words)
         lines = []
-        while True:
-            test_words = words[n:]
-            l = self.fit_text_words(test_words, rect)
-            if l == 0: break
+        while n < len(words):
+            l = self.fit_text_words(words[n:], rect)
             lines.append(" ".join(words[n:n+l]))
             n += l
-            if n >= end: break
         return lines
 
     def text_split_chars(self, s, rect: tuple) -> list[str]:
@@ -144,8 +220,6 @@ class PMFont:
                 n += 1
                 continue
             l = self.fit_text_chars(s[n:], rect)
-            if l == 0:
-                break
             lines.append(s[n:n+l])
             n += l
         return lines
@@ -156,6 +230,12 @@ class PMFont:
     def text_split(self, s, rect:tuple, split=None) -> list[str]:
         if s == None or not s.strip():
             s = ""
+        key = (self._font.path, self._pitch, s, _width(rect), _height(rect), split)
+        with PMFont._POOL_LOCK:
+            lines = PMFont._WRAPPED.get(key)
+            if lines is not None:
+                PMFont._WRAPPED.move_to_end(key)
+                return list(lines)
         split_fns = {
             "chars": self.text_split_chars,
             "words": self.text_split_words,
@@ -171,4 +251,8 @@ class PMFont:
             split_lines = split_fn(s, rect)
             results.extend(split_lines)
             height += self.height * len(split_lines)
-        return results
\ No newline at end of file
+        with PMFont._POOL_LOCK:
+            PMFont._WRAPPED[key] = tuple(results)
+            if len(PMFont._WRAPPED) > WRAPPED_SIZE:
+                PMFont._WRAPPED.popitem(last=False)
+        return results
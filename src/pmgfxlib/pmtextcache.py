@@ -0,0 +1,92 @@
+##
+## PMTextCache keeps rasterized text lines so that identical strings
+## (clock digits, card headers, compliments...) are not re-rendered by FreeType.
+##
+## Lines are cached as "L" coverage masks keyed by (font path, size, text),
+## the color is applied when the mask is drawn, so one entry serves every color
+## and the result is pixel-identical to ImageDraw.text().
+## Entries are evicted least-recently-used once the cache is over its byte budget.
+##
+
+import threading
+from collections import OrderedDict
+from PIL import Image, ImageDraw
+
+TEXT_CACHE_BYTES = 8 * 1024 * 1024
+
+class PMTextCache:
+    def __init__(self, max_bytes: int = TEXT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (mask, (dx, dy))
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _rasterize(self, font, text: str) -> tuple:
+        """ returns (mask, (dx, dy)), the mask is None for blank text """
+        with font.lock:
+            x0, y0, x1, y1 = font._font.getbbox(text)
+            if x1 <= x0 or y1 <= y0:
+                return None, (0, 0)
+            mask = Image.new("L", (x1 - x0, y1 - y0), 0)
+            ImageDraw.Draw(mask).text((-x0, -y0), text, font=font._font, fill=255)
+        return mask, (x0, y0)
+
+    def get(self, font, text: str) -> tuple:
+        """ The coverage mask of text in font and its offset from the text origin """
+        key = (font._font.path, font._font.size, text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = self._rasterize(font, text)
+        size = entry[0].width * entry[0].height if entry[0] else 0
+        if size > self.max_bytes:
+            return entry  # too big to cache
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = entry
+                self._bytes += size
+            while self._bytes > self.max_bytes:
+                _key, (mask, _offset) = self._entries.popitem(last=False)
+                self._bytes -= mask.width * mask.height if mask else 0
+                self.evictions += 1
+        return entry
+
+    def draw(self, draw: ImageDraw.ImageDraw, xy: tuple, text: str, font, fill) -> None:
+        """ Same as draw.text(xy, text, font=font._font, fill=fill), from the cache """
+        if xy[0] != int(xy[0]) or xy[1] != int(xy[1]):
+            ## FreeType renders fractional positions differently, the cached masks are for whole pixels
+            with font.lock:
+                draw.text(xy, text, font=font._font, fill=fill)
+            return
+        xy = (int(xy[0]), int(xy[1]))
+        mask, (dx, dy) = self.get(font, text)
+        if mask:
+            draw.bitmap((xy[0] + dx, xy[1] + dy), mask, fill=fill)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+## shared by all bitmaps
+TEXT_CACHE = PMTextCache()
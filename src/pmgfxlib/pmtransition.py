@@ -0,0 +1,83 @@
+##
+## PMTransition blends from one image to another over a short time,
+## one frame at a time (eg: SlideshowModule switching photos).
+##
+## Frames are rate-limited to fps, so a transition wakes the main loop
+## at most fps times a second. Both images must be the same size and mode.
+##
+## "crossfade" uses Image.blend, "wipe" reveals the new image from left to right.
+##
+
+import time
+from PIL import Image
+
+TRANSITIONS = ("crossfade", "wipe")
+
+class PMTransition:
+    def __init__(self, kind: str = "crossfade", duration_secs: float = 1.0, fps: float = 20):
+        if kind not in TRANSITIONS:
+            raise ValueError(f"Unknown transition: {kind}. Must be one of {TRANSITIONS}.")
+        self.kind = kind
+        self.duration_secs = duration_secs
+        self.fps = fps
+        self._old = None
+        self._new = None
+        self._start_time = 0.0
+        self._next_frame = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self._new is not None
+
+    def start(self, old: Image.Image, new: Image.Image, now: float = None) -> None:
+        if old.size != new.size or old.mode != new.mode:
+            raise ValueError(f"Can't transition from {old.mode} {old.size} to {new.mode} {new.size}")
+        self._old = old
+        self._new = new
+        self._start_time = self._next_frame = time.time() if now is None else now
+
+    def stop(self) -> None:
+        self._old = self._new = None
+
+    def next_frame_time(self) -> float:
+        """ when the next frame is due (None when no transition is running) """
+        return self._next_frame if self.active else None
+
+    def is_frame_due(self, now: float = None) -> bool:
+        return self.active and (time.time() if now is None else now) >= self._next_frame
+
+    def frame(self, now: float = None) -> Image.Image:
+        """ The image at time now, the last frame is the new image (and ends the transition) """
+        now = time.time() if now is None else now
+        t = (now - self._start_time) / self.duration_secs if self.duration_secs > 0 else 1.0
+        new = self._new
+        if t >= 1.0:
+            self.stop()
+            return new
+        self._next_frame = now + 1.0 / self.fps
+        if self.kind == "crossfade":
+            return Image.blend(self._old, new, t)
+        ## wipe
+        x = int(new.width * t)
+        img = self._old.copy()
+        if x > 0:
+            img.paste(new.crop((0, 0, x, new.height)), (0, 0))
+        return img
+
+def main():
+    ## benchmark the transitions on 1080p frames
+    ## PYTHONPATH=./src python -m pmgfxlib.pmtransition
+    width, height = 1920, 1080
+    old = Image.effect_noise((width, height), 64).convert("RGBA")
+    new = Image.linear_gradient("L").resize((width, height)).convert("RGBA")
+    for kind in TRANSITIONS:
+        transition = PMTransition(kind, duration_secs=1.0, fps=1000)
+        n = 50
+        transition.start(old, new, now=0.0)
+        start = time.time()
+        for i in range(n):
+            transition.frame(now=i / n)  # stay inside the transition
+        print(f"{kind:10} {width}x{height} {(time.time() - start) / n * 1000:8.2f} ms/frame")
+
+if __name__ == "__main__":
+    main()
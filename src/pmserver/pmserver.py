@@ -3,7 +3,7 @@ from threading import Thread
 import logging
 
 class PMServer:
-    def __init__(self, config, event_queue, host="0.0.0.0", port=8080):
+    def __init__(self, config, event_queue, host="0.0.0.0", port=8080, metrics=None):
         self.app = Flask(__name__)
         self.app.logger.disabled = True
 
@@ -21,6 +21,7 @@ class PMServer:
         self.host = host
         self.port = port
         self.config = config
+        self.metrics = metrics  # callable returning the profiler summary (see PMProfiler.summary)
         self._setup_routes()
 
     def _setup_routes(self):
@@ -28,6 +29,12 @@ class PMServer:
         def index():
             return render_template("index.html")
 
+        @self.app.route("/metrics")
+        def metrics():
+            if not self.metrics:
+                return jsonify({"error": "No metrics available"}), 404
+            return jsonify(self.metrics())
+
         @self.app.route("/<page>")
         def render_page(page):
             try:
@@ -1,8 +1,12 @@
+import hashlib
+import json
 import os
 from pydoc import text
 import sys
+import threading
 import time
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 
 from pymirror.pmtimer import PMTimer
 from pymirror.pmlogger import _debug, _error, _print, pmlogger, PMLoggerLevel
@@ -61,6 +65,7 @@ class FileInfo:
             with open(self.fname, 'w') as file:
                 _debug(f"Saving cache to {self.fname} with {len(text or '')}")
                 file.write(text or "")
+            self.update_stats()  # the new body's lifetime starts now
             return True
         except Exception as e:
             _error(f"Error saving cache: {e}")  # Add this for debugging
@@ -174,6 +179,184 @@ class FileCache(Cache):
         self.error = self.file_info.error
         return self.text
 
+class ImageCache:
+    """ Decoded bitmaps (anything with .width and .height) in memory,
+    evicted least-recently-used once they take more than max_bytes (as RGBA).
+    Safe to fill from a background thread.
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()  # key -> bitmap
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size(bitmap) -> int:
+        return bitmap.width * bitmap.height * 4
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._images
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+    def get(self, key):
+        with self._lock:
+            bitmap = self._images.get(key)
+            if bitmap is not None:
+                self._images.move_to_end(key)
+            return bitmap
+
+    def set(self, key, bitmap) -> None:
+        with self._lock:
+            if key in self._images:
+                self._bytes -= self._size(self._images.pop(key))
+            self._images[key] = bitmap
+            self._bytes += self._size(bitmap)
+            ## always keep the newest image, even if it's bigger than the budget on its own
+            while self._bytes > self.max_bytes and len(self._images) > 1:
+                old_key, old_bitmap = self._images.popitem(last=False)
+                self._bytes -= self._size(old_bitmap)
+                _debug(f"ImageCache evicted {old_key}")
+
+    def invalidate(self, key=None) -> None:
+        """ drop one image, or all of them """
+        with self._lock:
+            if key is None:
+                self._images.clear()
+                self._bytes = 0
+            elif key in self._images:
+                self._bytes -= self._size(self._images.pop(key))
+
+class ThumbnailCache:
+    """ Photos pre-scaled to one size / scale mode, kept on disk in cache_dir.
+
+    Thumbnails are keyed by (source path, mtime, width, height, scale), so an edited
+    photo gets a new thumbnail. cache_dir/index.json remembers the folder's files and
+    their mtimes, the folder is only rescanned when its own mtime changes
+    (a file was added, deleted or renamed).
+    """
+    INDEX_FNAME = "index.json"
+    JPEG_QUALITY = 92
+
+    def __init__(self, cache_dir: str, width: int, height: int, scale: str = None, extensions: tuple = None):
+        self.cache_dir = cache_dir
+        self.extensions = extensions  # only index files with these extensions, None = all files
+        self.width = width
+        self.height = height
+        self.scale = scale or "stretch"
+        self.folder = None
+        self._photos = {}  # source path -> mtime
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, self.INDEX_FNAME)
+
+    def _read_index(self) -> dict:
+        try:
+            with open(self._index_path(), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            _debug(f"No thumbnail index in {self.cache_dir}: {e}")
+            return {}
+
+    def _write_index(self, folder_mtime: float) -> None:
+        index = {"folder": self.folder, "folder_mtime": folder_mtime, "photos": self._photos}
+        tmp_path = self._index_path() + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self._index_path())  # never leave a half-written index
+
+    def _thumb_path(self, path: str, mtime: float) -> str:
+        key = f"{path}|{mtime}|{self.width}x{self.height}|{self.scale}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode()).hexdigest())
+
+    def _remove_thumbs(self, path: str, mtime: float) -> None:
+        for ext in (".jpg", ".png"):
+            try:
+                os.remove(self._thumb_path(path, mtime) + ext)
+            except FileNotFoundError:
+                pass
+
+    def list_photos(self, folder: str) -> list[str]:
+        """ The photo paths in folder, from the index when the folder hasn't changed """
+        self.folder = folder
+        index = self._read_index()
+        with self._lock:
+            self._photos = index.get("photos", {}) if index.get("folder") == folder else {}
+        if not self._photos or index.get("folder_mtime") != os.stat(folder).st_mtime:
+            self.refresh()
+        else:
+            _debug(f"Thumbnail index for {folder} is up to date ({len(self._photos)} photos)")
+        return sorted(self._photos)
+
+    def _wanted(self, name: str) -> bool:
+        return not self.extensions or os.path.splitext(name)[1].lower() in self.extensions
+
+    def update(self, added: list[str], removed: list[str]) -> None:
+        """ Apply changes reported by a PMWatcher without rescanning the folder """
+        with self._lock:
+            for path in removed:
+                mtime = self._photos.pop(path, None)
+                if mtime is not None:
+                    self._remove_thumbs(path, mtime)
+            for path in added:
+                try:
+                    mtime = os.stat(path).st_mtime
+                except OSError:
+                    continue  # gone again
+                old_mtime = self._photos.get(path)
+                if old_mtime is not None and old_mtime != mtime:
+                    self._remove_thumbs(path, old_mtime)
+                self._photos[path] = mtime
+            self._write_index(os.stat(self.folder).st_mtime)
+
+    def refresh(self) -> tuple[list[str], list[str]]:
+        """ Rescan the folder, returns (added or changed paths, deleted paths) """
+        folder_mtime = os.stat(self.folder).st_mtime
+        photos = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if self._wanted(entry.name) and entry.is_file():
+                    photos[entry.path] = entry.stat().st_mtime
+        with self._lock:
+            old_photos = self._photos
+            self._photos = photos
+        changed = [path for path, mtime in photos.items() if old_photos.get(path) != mtime]
+        deleted = [path for path in old_photos if photos.get(path) != old_photos[path]]
+        for path in deleted:
+            self._remove_thumbs(path, old_photos[path])  # deleted or replaced
+        deleted = [path for path in deleted if path not in photos]
+        self._write_index(folder_mtime)
+        _print(f"Thumbnail index for {self.folder}: {len(photos)} photos, {len(changed)} new or changed, {len(deleted)} deleted")
+        return changed, deleted
+
+    def load(self, path: str):
+        """ The scaled photo as a PMBitmap, from the cache dir or decoded and saved there """
+        from pmgfxlib.pmbitmap import PMBitmap
+        with self._lock:
+            mtime = self._photos.get(path)
+        if mtime is None:
+            mtime = os.stat(path).st_mtime
+        thumb_path = self._thumb_path(path, mtime)
+        for ext in (".jpg", ".png"):
+            if os.path.exists(thumb_path + ext):
+                return PMBitmap().load(thumb_path + ext)
+        bitmap = PMBitmap().load(path, self.width, self.height, self.scale, draft=True)
+        img = bitmap._img
+        ## photos are opaque, keep a png only when there's transparency
+        opaque = img.getchannel("A").getextrema() == (255, 255)
+        ext = ".jpg" if opaque else ".png"
+        tmp_path = thumb_path + ".tmp" + ext
+        if opaque:
+            img.convert("RGB").save(tmp_path, quality=self.JPEG_QUALITY)
+        else:
+            img.save(tmp_path)
+        os.replace(tmp_path, thumb_path + ext)
+        return bitmap
+
 if __name__ == "__main__":
     def memtest():
         memcache = MemoryCache("one second later", 1000)
@@ -0,0 +1,114 @@
+##
+## Framebuffer pixel converters
+##
+## Every converter has the signature of clib.convert_region:
+##   convert_region(src, src_width, src_x, src_y, width, height,
+##                  dst, dst_stride, dst_x, dst_y, rotate=0, format="RGB565", dither=False)
+## src is an RGBA buffer, dst is any writable buffer (eg: the mmap'd framebuffer).
+## The region is rotated counter-clockwise (like Image.rotate) and written with
+## its top-left corner at (dst_x, dst_y).
+##
+## The C extension (src/clib) is used when it's built, otherwise NumPy.
+##
+
+import time
+
+from pymirror.pmlogger import _debug
+
+BYTES_PER_PIXEL = {
+    "RGB565": 2,
+    "BGR888": 3,
+    "XRGB8888": 4,
+}
+
+## 4x4 ordered dither (Bayer) thresholds, same as clib.c
+_BAYER4 = (
+    (0, 8, 2, 10),
+    (12, 4, 14, 6),
+    (3, 11, 1, 9),
+    (15, 7, 13, 5),
+)
+
+def numpy_convert_region(src, src_width, src_x, src_y, width, height, dst, dst_stride, dst_x, dst_y, rotate=0, format="RGB565", dither=False):
+    import numpy as np
+    if format not in BYTES_PER_PIXEL:
+        raise ValueError(f"Unsupported pixel format: {format}")
+    if rotate not in (0, 90, 180, 270):
+        raise ValueError(f"Invalid rotation angle: {rotate}")
+    if width <= 0 or height <= 0:
+        return
+    rgba = np.frombuffer(src, dtype=np.uint8).reshape(-1, src_width, 4)
+    if src_x < 0 or src_y < 0 or src_x + width > src_width or src_y + height > rgba.shape[0]:
+        raise ValueError("Source region is outside the source buffer")
+    rgba = rgba[src_y:src_y + height, src_x:src_x + width]
+    if rotate:
+        rgba = np.rot90(rgba, rotate // 90)  # counter-clockwise, like Image.rotate
+    out_height, out_width = rgba.shape[:2]
+    bpp = BYTES_PER_PIXEL[format]
+    offset = dst_y * dst_stride + dst_x * bpp
+    if dst_x < 0 or dst_y < 0 or (dst_x + out_width) * bpp > dst_stride \
+            or (dst_y + out_height - 1) * dst_stride + (dst_x + out_width) * bpp > memoryview(dst).nbytes:
+        raise ValueError("Destination region is outside the destination buffer")
+    ## a strided view of the destination rows (no copy)
+    out = np.ndarray((out_height, out_width, bpp), dtype=np.uint8, buffer=dst, offset=offset, strides=(dst_stride, bpp, 1))
+    if format == "RGB565":
+        r = rgba[..., 0].astype(np.uint16)
+        g = rgba[..., 1].astype(np.uint16)
+        b = rgba[..., 2].astype(np.uint16)
+        if dither:
+            ys = (dst_y + np.arange(out_height)) & 3
+            xs = (dst_x + np.arange(out_width)) & 3
+            t = np.array(_BAYER4, dtype=np.uint16)[ys[:, None], xs[None, :]]
+            r = np.minimum(r + ((t << 3) >> 4), 255)
+            g = np.minimum(g + ((t << 2) >> 4), 255)
+            b = np.minimum(b + ((t << 3) >> 4), 255)
+        v = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
+        out[...] = np.ascontiguousarray(v, dtype="<u2").view(np.uint8).reshape(out_height, out_width, 2)
+    elif format == "BGR888":
+        out[...] = rgba[..., 2::-1]
+    else:
+        out[..., :3] = rgba[..., 2::-1]
+        out[..., 3] = 0xFF
+
+def select_converter(name: str = None):
+    """Pick the converter backend: "clib" when the C extension is built, otherwise "numpy".
+    returns (backend name, convert_region function)
+    """
+    if name in (None, "clib"):
+        try:
+            from clib import convert_region
+            return "clib", convert_region
+        except ImportError as e:
+            if name == "clib":
+                raise
+            _debug(f"clib.convert_region is not available ({e}), falling back to NumPy")
+    if name in (None, "numpy"):
+        import numpy  # make sure the fallback can run
+        return "numpy", numpy_convert_region
+    raise ValueError(f"Unknown converter: {name}. Must be one of clib, numpy.")
+
+def main():
+    ## benchmark the converters on a 1080p frame
+    ## PYTHONPATH=./src python -m pymirror.pmconvert
+    from PIL import Image
+    width, height = 1920, 1080
+    src = Image.effect_noise((width, height), 64).convert("RGBA").tobytes()
+    clock = (40, 160, 640, 200)  # x0, y0, width, height of a ticking clock
+    for backend in ("clib", "numpy"):
+        try:
+            name, convert_region = select_converter(backend)
+        except ImportError as e:
+            print(f"{backend}: not available ({e})")
+            continue
+        for format, bpp in BYTES_PER_PIXEL.items():
+            dst = bytearray(width * height * bpp)
+            for label, (x0, y0, w, h), rotate in (("frame", (0, 0, width, height), 0), ("clock", clock, 0), ("clock rot90", clock, 90)):
+                n = 20
+                start = time.time()
+                for i in range(n):
+                    dst_x, dst_y = (y0, width - x0 - w) if rotate else (x0, y0)
+                    convert_region(src, width, x0, y0, w, h, dst, (height if rotate else width) * bpp, dst_x, dst_y, rotate, format)
+                print(f"{name:6} {format:9} {label:12} {(time.time() - start) / n * 1000:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+##
+## PMFrameBuffer keeps the framebuffer device (eg: /dev/fb0) open and memory-mapped
+## so that only the damaged parts of the screen are converted and written each frame.
+##
+## NOTE: the screen image is in "logical" coordinates (before rotation),
+## the framebuffer is in "device" coordinates (after rotation).
+##
+
+import mmap
+import os
+import re
+import stat
+from dataclasses import dataclass
+from PIL import Image
+
+from pymirror.pmrect import PMRect
+from pymirror.pmconvert import BYTES_PER_PIXEL, select_converter
+from pymirror.pmlogger import _debug, _print
+
+SYSFS_GRAPHICS = "/sys/class/graphics"
+
+## pixel format for each framebuffer depth (little-endian, as on the RPi)
+PIXEL_FORMATS = {
+    16: "RGB565",
+    24: "BGR888",
+    32: "XRGB8888",  # stored as B, G, R, X bytes
+}
+
+@dataclass
+class PMFrameBufferInfo:
+    width: int = 1920
+    height: int = 1080
+    bits_per_pixel: int = 16
+    stride: int = 1920 * 2  # bytes per framebuffer line (may include padding)
+    pixel_format: str = "RGB565"
+    virtual_height: int = None  # lines in the framebuffer memory (eg: 2x height when double-buffered), None = height
+
+def _read_sysfs(path: str) -> str:
+    with open(path, "r") as f:
+        return f.read().strip()
+
+def _read_visible_size(fb_dir: str) -> tuple[int, int] | None:
+    """ The visible resolution from the current mode (eg: "U:1920x1080p-60"), or the first listed mode """
+    for name in ("mode", "modes"):
+        try:
+            lines = _read_sysfs(os.path.join(fb_dir, name)).splitlines()
+        except OSError:
+            continue
+        match = re.search(r"(\d+)x(\d+)", lines[0]) if lines else None
+        if match:
+            return int(match.group(1)), int(match.group(2))
+    return None
+
+def read_fb_info(device: str, sysfs_root: str = SYSFS_GRAPHICS) -> PMFrameBufferInfo:
+    """Read the framebuffer geometry from sysfs (eg: /sys/class/graphics/fb0/).
+    returns None if the device has no sysfs entry (eg: a regular file).
+    """
+    fb_dir = os.path.join(sysfs_root, os.path.basename(device))
+    try:
+        ## the virtual size can be larger than the screen (double-buffering, panning), it only sizes the mapping
+        virtual_width, virtual_height = [int(x) for x in _read_sysfs(os.path.join(fb_dir, "virtual_size")).split(",")]
+        bits_per_pixel = int(_read_sysfs(os.path.join(fb_dir, "bits_per_pixel")))
+        stride = int(_read_sysfs(os.path.join(fb_dir, "stride")))
+    except (OSError, ValueError) as e:
+        _debug(f"No framebuffer geometry for {device} in {fb_dir}: {e}")
+        return None
+    if bits_per_pixel not in PIXEL_FORMATS:
+        raise ValueError(f"Unsupported framebuffer depth: {bits_per_pixel} bits per pixel ({device})")
+    visible_size = _read_visible_size(fb_dir)
+    if not visible_size:
+        _debug(f"No mode for {device} in {fb_dir}, using the virtual size")
+    width, height = visible_size or (virtual_width, virtual_height)
+    info = PMFrameBufferInfo(width, height, bits_per_pixel, stride, PIXEL_FORMATS[bits_per_pixel], virtual_height)
+    _debug(f"Framebuffer {device}: {info}")
+    return info
+
+class PMFrameBuffer:
+    def __init__(self, device: str, info: PMFrameBufferInfo, rotate: int = 0, dither: bool = False, converter: str = None):
+        if info.pixel_format not in BYTES_PER_PIXEL:
+            raise ValueError(f"Unsupported pixel format: {info.pixel_format}. Must be one of {list(BYTES_PER_PIXEL)}.")
+        ## converter: None picks clib if it's built, else numpy
+        self.converter, self._convert_region = select_converter(converter)
+        _print(f"Framebuffer {device}: using the {self.converter} converter")
+        self.device = device
+        self.info = info
+        self.width = info.width  # device width in pixels
+        self.height = info.height  # device height in pixels
+        self.rotate = rotate
+        self.dither = dither  # ordered dithering (RGB565 only)
+        self.bytes_per_pixel = BYTES_PER_PIXEL[info.pixel_format]
+        self.stride = info.stride or self.width * self.bytes_per_pixel  # bytes per framebuffer line
+        self.size = self.stride * max(self.height, info.virtual_height or 0)  # map all of the framebuffer memory
+        self._fd = os.open(device, os.O_RDWR | os.O_CREAT)
+        if stat.S_ISREG(os.fstat(self._fd).st_mode) and os.fstat(self._fd).st_size < self.size:
+            ## a regular file standing in for the device (eg: off-device testing)
+            os.ftruncate(self._fd, self.size)
+        self._mm = mmap.mmap(self._fd, self.size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        _debug(f"Mapped framebuffer {device}: {self.width}x{self.height} {info.pixel_format}, stride={self.stride}, rotate={rotate}")
+
+    def close(self) -> None:
+        if self._mm:
+            self._mm.close()
+            self._mm = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def clear(self) -> None:
+        """Clear the framebuffer by writing zeros to it."""
+        self._mm.seek(0)
+        self._mm.write(bytes(self.size))
+
+    def _to_device_rect(self, rect: PMRect, img_width: int, img_height: int) -> PMRect:
+        """Map a logical rect to device coordinates (rotation is counter-clockwise, like Image.rotate)."""
+        x0, y0, x1, y1 = rect
+        if self.rotate == 90:
+            return PMRect(y0, img_width - 1 - x1, y1, img_width - 1 - x0)
+        if self.rotate == 180:
+            return PMRect(img_width - 1 - x1, img_height - 1 - y1, img_width - 1 - x0, img_height - 1 - y0)
+        if self.rotate == 270:
+            return PMRect(img_height - 1 - y1, x0, img_height - 1 - y0, x1)
+        return PMRect(x0, y0, x1, y1)
+
+    def _write_rect(self, img: Image.Image, rect: PMRect) -> None:
+        if rect.width == img.width and rect.height == img.height:
+            region = img
+        else:
+            region = img.crop((rect.x0, rect.y0, rect.x1 + 1, rect.y1 + 1))
+        dev = self._to_device_rect(rect, img.width, img.height)
+        ## rotate and convert straight into the mapped framebuffer
+        self._convert_region(
+            region.tobytes("raw"), region.width, 0, 0, region.width, region.height,
+            self._mm, self.stride, dev.x0, dev.y0,
+            self.rotate, self.info.pixel_format, self.dither
+        )
+
+    def write(self, img: Image.Image, rects: list[PMRect] = None) -> None:
+        """Convert and write the damaged rects of img (None = the whole image) in place."""
+        screen_rect = PMRect(0, 0, img.width - 1, img.height - 1)
+        if rects is None:
+            rects = [screen_rect]
+        for rect in rects:
+            rect = rect.intersection(screen_rect)
+            if rect:
+                self._write_rect(img, rect)
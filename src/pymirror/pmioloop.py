@@ -0,0 +1,68 @@
+##
+## PMIOLoop runs one asyncio event loop on a background thread for all network I/O,
+## so fetches make progress whether or not a module is polling them
+## and the render loop never runs the event loop itself.
+##
+## submit() returns a concurrent.futures.Future, on_done callbacks and listeners
+## (eg: PyMirror.wakeup) run on the I/O thread when a coroutine finishes.
+##
+
+import asyncio
+import atexit
+import threading
+from concurrent.futures import Future
+
+from pymirror.pmlogger import _debug, _error
+
+class PMIOLoop:
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.listeners = []  # called with every finished future (eg: to wake the main loop)
+        self._thread = threading.Thread(target=self._run, name="pm-io", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def get(cls) -> "PMIOLoop":
+        """ The process-wide I/O loop, started on first use """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = PMIOLoop()
+                atexit.register(cls._instance.stop)
+            return cls._instance
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        _debug("I/O loop started")
+        self.loop.run_forever()
+        self.loop.close()
+        _debug("I/O loop stopped")
+
+    def _finished(self, future: Future, on_done) -> None:
+        for callback in ([on_done] if on_done else []) + self.listeners:
+            try:
+                callback(future)
+            except Exception as e:
+                _error(f"I/O callback {callback} failed: {e}")
+
+    def submit(self, coro, on_done=None) -> Future:
+        """ Run coro on the I/O loop, on_done(future) is called when it's finished """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        future.add_done_callback(lambda future: self._finished(future, on_done))
+        return future
+
+    def run(self, coro, timeout: float = None):
+        """ Run coro on the I/O loop and wait for its result (don't call this from the I/O thread) """
+        return self.submit(coro).result(timeout)
+
+    def add_listener(self, callback) -> None:
+        self.listeners.append(callback)
+
+    def stop(self) -> None:
+        if not self.loop.is_running(): return
+        from pymirror.pmwebapi import close_http_clients
+        close_http_clients()  # while the loop can still run aclose()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
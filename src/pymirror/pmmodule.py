@@ -23,6 +23,9 @@ class PMModuleDef(ABC):
 	disabled: bool = False
 	force_render: bool = False
 	force_update: bool = False
+	max_fps: float = None  # most exec() / render() calls per second (None = no limit)
+	priority: int = 0  # higher priority modules render first when a frame is over budget
+	blocking: bool = False  # exec() blocks (eg: subprocess, slow parsing), run it on a worker thread
 
 class PMModule(ABC):
 	def __init__(self, pm, config: SafeNamespace):
@@ -36,9 +39,15 @@ class PMModule(ABC):
 		self.disabled = _moddef.disabled
 		self.force_render = _moddef.force_render
 		self.force_update = _moddef.force_update
+		self.max_fps = _moddef.max_fps
+		self.priority = _moddef.priority
+		self.blocking = _moddef.blocking
+		self._last_exec = 0.0  # time.time() of the last exec() call (for max_fps)
 		self.timer = PMTimer(0, 0)
+		self.timer.set_timeout(0)  # disabled until the module sets a timeout
 		self.subscriptions = []
 		self._time = 0.0  # time taken for module execution
+		self._visible = False  # was the module's bitmap on-screen at the last composite
 		self.bitmap = None
 		rect = self._compute_rect(self.position)
 		if rect:
@@ -111,6 +120,13 @@ class PMModule(ABC):
 		"""
 		pass
 
+	def next_wakeup(self) -> float:
+		""" When exec() next needs to be called, as a time.time() value.
+		The main loop sleeps until the earliest wakeup of all modules, or until an event arrives.
+		By default this is the module's timer, None (no timer) means the module only changes on events.
+		"""
+		return self.timer.future_time or None
+
 	def onEvent(self, event) -> None:
 		""" Handle an event.
 		This is called by the PM when an event is dispatched to the module.
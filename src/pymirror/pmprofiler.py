@@ -0,0 +1,89 @@
+##
+## PMProfiler records how long each stage of the main loop takes, per frame,
+## and how long each module spends in exec(), render() and compositing.
+## The last N frames are kept in a ring buffer, summary() reports p50/p95/max
+## in milliseconds (served as JSON on the PMServer /metrics route).
+##
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+PROFILER_FRAMES = 300  # frames kept in the ring buffer
+
+def _percentile(values: list[float], pct: float) -> float:
+    """ nearest-rank percentile of an already sorted list """
+    if not values: return 0.0
+    n = max(1, round(pct / 100 * len(values)))
+    return values[min(n, len(values)) - 1]
+
+def _stats_ms(values: list[float]) -> dict:
+    values = sorted(values)
+    return {
+        "p50": round(_percentile(values, 50) * 1000, 3),
+        "p95": round(_percentile(values, 95) * 1000, 3),
+        "max": round((values[-1] if values else 0.0) * 1000, 3),
+    }
+
+class PMFrameTimes:
+    def __init__(self):
+        self.start = time.time()
+        self.total = 0.0
+        self.stages = {}  # stage name -> seconds
+        self.modules = {}  # module name -> {stage name -> seconds}
+
+class PMProfiler:
+    def __init__(self, frames: int = PROFILER_FRAMES):
+        self._frames = deque(maxlen=frames)
+        self._frame = PMFrameTimes()
+        self._lock = threading.Lock()  # modules are timed from worker threads, summary() runs on the server thread
+
+    def begin_frame(self) -> None:
+        self._frame = PMFrameTimes()
+
+    def end_frame(self) -> None:
+        frame = self._frame
+        frame.total = time.time() - frame.start
+        with self._lock:
+            self._frames.append(frame)
+
+    @contextmanager
+    def stage(self, name: str):
+        """ with profiler.stage("flush"): ... """
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.time() - start_time)
+
+    def add_stage(self, name: str, secs: float) -> None:
+        stages = self._frame.stages
+        stages[name] = stages.get(name, 0.0) + secs
+
+    def add_module(self, module_name: str, stage: str, secs: float) -> None:
+        with self._lock:
+            stages = self._frame.modules.setdefault(module_name, {})
+            stages[stage] = stages.get(stage, 0.0) + secs
+
+    def summary(self) -> dict:
+        """ p50/p95/max (ms) of every stage and module over the buffered frames """
+        with self._lock:
+            frames = list(self._frames)
+        stages = {}
+        modules = {}
+        for frame in frames:
+            for name, secs in frame.stages.items():
+                stages.setdefault(name, []).append(secs)
+            for module_name, module_stages in frame.modules.items():
+                for name, secs in module_stages.items():
+                    modules.setdefault(module_name, {}).setdefault(name, []).append(secs)
+        return {
+            "frames": len(frames),
+            "frame": _stats_ms([frame.total for frame in frames]),
+            "stages": {name: _stats_ms(values) for name, values in stages.items()},
+            "modules": {
+                module_name: {name: _stats_ms(values) for name, values in module_stages.items()}
+                for module_name, module_stages in modules.items()
+            },
+        }
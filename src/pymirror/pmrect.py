@@ -112,8 +112,29 @@ class PMRect:
         return self.x0 <= x < self.x1 and self.y0 <= y < self.y1
 
     def intersects(self, other: 'PMRect') -> bool:
-        return not (self.x1 <= other.x0 or self.x0 >= other.x1 or
-                    self.y1 <= other.y0 or self.y0 >= other.y1)
+        ## x1, y1 are inclusive (see width / height)
+        return not (self.x1 < other.x0 or self.x0 > other.x1 or
+                    self.y1 < other.y0 or self.y0 > other.y1)
+
+    def intersection(self, other: 'PMRect') -> 'PMRect':
+        """Return the overlapping area of two rectangles, or None if they don't overlap."""
+        if not self.intersects(other):
+            return None
+        return PMRect(
+            max(self.x0, other.x0),
+            max(self.y0, other.y0),
+            min(self.x1, other.x1),
+            min(self.y1, other.y1)
+        )
+
+    def union(self, other: 'PMRect') -> 'PMRect':
+        """Return the smallest rectangle that covers both rectangles."""
+        return PMRect(
+            min(self.x0, other.x0),
+            min(self.y0, other.y0),
+            max(self.x1, other.x1),
+            max(self.y1, other.y1)
+        )
 
     def to_tuple(self) -> tuple:
         return (self.x0, self.y0, self.x1, self.y1)
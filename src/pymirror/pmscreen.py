@@ -3,6 +3,9 @@ from dataclasses import dataclass
 from PIL import Image
 from pmgfxlib import PMBitmap, PMGfx
 from pymirror.utils import from_dict
+from pymirror.pmrect import PMRect
+from pymirror.pmframebuffer import PMFrameBuffer, PMFrameBufferInfo, read_fb_info, SYSFS_GRAPHICS
+from pymirror.pmconvert import BYTES_PER_PIXEL
 from .pmlogger import _debug
 
 @from_dict
@@ -20,12 +23,20 @@ class PMScreenConfig:
         font_size: int = 64
         output_file: str = None
         frame_buffer: str = None # Path to framebuffer device
+        pixel_format: str = None # framebuffer pixel format (None = detect from sysfs, else RGB565)
+        sysfs_graphics: str = SYSFS_GRAPHICS # where to find the framebuffer geometry
+        dither: bool = False # ordered dithering when converting to RGB565
+        converter: str = None # framebuffer converter: "clib", "numpy" or None (clib if it's built)
 
 class PMScreen:
     def __init__(self, _config):
         self._config = _config
         ## by convention the config for an object is _classname
         self._screen = _screen = PMScreenConfig.from_dict(_config.__dict__)
+        self._fb_info = self._read_fb_info()
+        if self._fb_info:
+            ## the framebuffer knows the real panel size
+            self._screen.width, self._screen.height = self._fb_info.width, self._fb_info.height
         if self._screen.rotate:
             if self._screen.rotate not in [0, 90, 180, 270]:
                 raise ValueError(f"Invalid rotation angle: {self._screen.rotate}. Must be one of 0, 90, 180, or 270 degrees.")
@@ -42,46 +53,50 @@ class PMScreen:
         gfx.line_width = _screen.line_width or gfx.line_width
         gfx.set_font(self._screen.font_name, self._screen.font_size)
 
+        self._fb = None
+        if self._fb_info:
+            # keep the framebuffer device open and memory-mapped
+            self._fb = PMFrameBuffer(self._screen.frame_buffer, self._fb_info, self._screen.rotate, self._screen.dither, self._screen.converter)
         self._hard_clear()
 
+    def _read_fb_info(self) -> PMFrameBufferInfo:
+        """Get the framebuffer geometry from sysfs, or from the config if sysfs doesn't know the device."""
+        _screen = self._screen
+        if not _screen.frame_buffer:
+            return None
+        info = read_fb_info(_screen.frame_buffer, _screen.sysfs_graphics)
+        if not info:
+            pixel_format = _screen.pixel_format or "RGB565"
+            bytes_per_pixel = BYTES_PER_PIXEL.get(pixel_format, 2)
+            info = PMFrameBufferInfo(_screen.width, _screen.height, bytes_per_pixel * 8, _screen.width * bytes_per_pixel, pixel_format)
+        elif _screen.pixel_format:
+            if BYTES_PER_PIXEL.get(_screen.pixel_format, 0) * 8 != info.bits_per_pixel:
+                raise ValueError(f"Pixel format {_screen.pixel_format} does not match the {info.bits_per_pixel} bit framebuffer {_screen.frame_buffer}")
+            info.pixel_format = _screen.pixel_format
+        return info
+
     def _hard_clear(self):
         """Clear the framebuffer by writing zeros to it."""
-        if self._screen.frame_buffer:
-            # Open the framebuffer device and write zeros to it
-            with open(self._screen.frame_buffer, "wb") as f:
-                f.write(b'\x00' * (1920 * 1080 * 2))  # Assuming RGB565 format, 2 bytes per pixel
+        if self._fb:
+            self._fb.clear()
 
-    def _write_framebuffer(self, img: Image.Image) -> None:
-        """Write the image to the framebuffer."""
-        # self._screen.frame_buffer = "./fb0.jpg"
-        if self._screen.frame_buffer:
-            _debug(f"Writing to framebuffer: {self._screen.frame_buffer}")
-            from clib import rgba_to_rgb16
-            _debug(f"Image size: {img.size}, mode: {img.mode}")
-            if self._screen.rotate:
-                img = img.rotate(self._screen.rotate, expand=True)
-            raw = img.tobytes("raw")
-            _debug(f"Raw image size: {len(raw)} bytes")
-            # Convert the image to RGB565 format
-            rgb565 = rgba_to_rgb16(raw, img.width, img.height)
-            _debug(f"Converted to RGB565 size: {len(rgb565)} bytes")
-            with open(self._screen.frame_buffer, "wb") as f:
-                _debug(f"Saving RGB565 image to {self._screen.frame_buffer}")
-                f.write(rgb565)
-            _debug("Framebuffer write complete")
-            rgb565 = rgba_to_rgb16(raw, img.width, img.height)
-            _debug(f"Converted to RGB565 size: {len(rgb565)} bytes")
-            with open(self._screen.frame_buffer, "wb") as f:
-                _debug(f"Saving RGB565 image to {self._screen.frame_buffer}")
-                f.write(rgb565)
-            _debug("Framebuffer write complete")
+    def _write_framebuffer(self, img: Image.Image, rects: list[PMRect] = None) -> None:
+        """Write the damaged rects of the image (None = the whole image) to the framebuffer."""
+        if self._fb:
+            _debug(f"Writing {len(rects) if rects else 'all'} rect(s) to framebuffer: {self._fb.device}")
+            self._fb.write(img, rects)
 
     def _atomic_write(self, img: Image.Image) -> None:
         if self._screen.output_file:
             self.bitmap._img.convert("RGB").save(self._screen.output_file+".tmp", "JPEG")
             os.rename(self._screen.output_file+".tmp", self._screen.output_file)
 
-    def flush(self) -> None:
+    def flush(self, rects: list[PMRect] = None) -> None:
+        """Show the screen bitmap.
+        rects are the damaged screen regions, None means the whole screen has changed.
+        """
+        if rects is not None and not rects:
+            return  # nothing has changed
         img = self.bitmap._img
-        self._write_framebuffer(img)
+        self._write_framebuffer(img, rects)
         self._atomic_write(img)
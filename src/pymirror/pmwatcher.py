@@ -0,0 +1,180 @@
+##
+## PMWatcher watches a folder (or a single file) on a background thread
+## and calls back with the files that were added / changed and removed.
+##
+## Linux inotify is used through ctypes, other platforms (or when inotify
+## isn't available) poll the folder every poll_secs.
+##
+## NOTE: callbacks run on the watcher thread, hand the changes over to the
+## main loop (eg: a locked list + pm.wakeup()) rather than touching module state.
+##
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+
+from pymirror.pmlogger import _debug, _error
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp")
+
+## inotify constants (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+class PMWatcher:
+    def __init__(self, path: str, callback, extensions: tuple = None, poll_secs: float = 2.0, use_inotify: bool = True):
+        """ path: a folder, or a file (its folder is watched for that name only)
+        callback(added: list[str], removed: list[str]) gets full paths, added includes changed files
+        extensions: only report files with these extensions (eg: IMAGE_EXTENSIONS), None = all files
+        """
+        path = os.path.abspath(path)
+        if os.path.isdir(path):
+            self.folder, self.name = path, None
+        else:
+            self.folder, self.name = os.path.split(path)
+        self.callback = callback
+        self.extensions = tuple(ext.lower() for ext in extensions) if extensions else None
+        self.poll_secs = poll_secs
+        self.use_inotify = use_inotify
+        self.mode = None  # "inotify" or "poll", once started
+        self._stop = threading.Event()
+        self._thread = None
+        self._fd = None
+
+    def _wanted(self, name: str) -> bool:
+        if self.name is not None:
+            return name == self.name
+        if self.extensions is not None:
+            return os.path.splitext(name)[1].lower() in self.extensions
+        return not name.startswith(".")  # skip hidden and temp files
+
+    def start(self) -> "PMWatcher":
+        self._fd = self._inotify_init() if self.use_inotify else None
+        self.mode = "inotify" if self._fd is not None else "poll"
+        target = self._run_inotify if self._fd is not None else self._run_poll
+        self._thread = threading.Thread(target=target, name=f"pm-watch-{os.path.basename(self.folder)}", daemon=True)
+        self._thread.start()
+        _debug(f"Watching {self.folder} ({self.mode})")
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_secs + 1)
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _notify(self, added: list[str], removed: list[str]) -> None:
+        if not added and not removed: return
+        try:
+            self.callback(added, removed)
+        except Exception as e:
+            _error(f"Watcher callback for {self.folder} failed: {e}")
+
+    ## inotify
+
+    def _inotify_init(self):
+        """ returns the inotify fd watching the folder, or None if inotify isn't available """
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+            mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE | IN_DELETE_SELF
+            if libc.inotify_add_watch(fd, os.fsencode(self.folder), mask) < 0:
+                err = ctypes.get_errno()
+                os.close(fd)
+                raise OSError(err, f"inotify_add_watch failed for {self.folder}")
+            return fd
+        except (OSError, AttributeError) as e:
+            _debug(f"inotify is not available ({e}), polling {self.folder}")
+            return None
+
+    def _run_inotify(self) -> None:
+        while not self._stop.is_set():
+            ## wake up now and then to check for stop()
+            ready, _, _ = select.select([self._fd], [], [], 1.0)
+            if not ready: continue
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            added, removed = [], []
+            offset = 0
+            while offset < len(data):
+                _wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+                offset += length
+                if mask & IN_DELETE_SELF:
+                    _error(f"Watched folder {self.folder} was deleted")
+                    self._stop.set()
+                    break
+                if not name or not self._wanted(name): continue
+                path = os.path.join(self.folder, name)
+                if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    if path in removed: removed.remove(path)
+                    if path not in added: added.append(path)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    if path in added: added.remove(path)
+                    if path not in removed: removed.append(path)
+            self._notify(added, removed)
+
+    ## polling
+
+    def _scan(self) -> dict:
+        files = {}
+        try:
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    if self._wanted(entry.name) and entry.is_file():
+                        files[entry.path] = entry.stat().st_mtime
+        except OSError as e:
+            _error(f"Can't scan {self.folder}: {e}")
+        return files
+
+    def _run_poll(self) -> None:
+        files = self._scan()
+        folder_mtime = None
+        while not self._stop.wait(self.poll_secs):
+            if self.name is None:
+                ## adding / removing a file changes the folder's mtime, skip the scan if it didn't change
+                ## (so files rewritten in place are only reported by inotify, or when watching a single file)
+                try:
+                    mtime = os.stat(self.folder).st_mtime
+                except OSError:
+                    continue
+                if mtime == folder_mtime: continue
+                folder_mtime = mtime
+            new_files = self._scan()
+            added = [path for path, mtime in new_files.items() if files.get(path) != mtime]
+            removed = [path for path in files if path not in new_files]
+            files = new_files
+            self._notify(added, removed)
+
+if __name__ == "__main__":
+    ## watch a folder and print the changes
+    ## PYTHONPATH=./src python -m pymirror.pmwatcher ./images [--poll]
+    import time
+    folder = sys.argv[1] if len(sys.argv) > 1 else "."
+    watcher = PMWatcher(folder, lambda added, removed: print(f"added: {added}\nremoved: {removed}"),
+        use_inotify="--poll" not in sys.argv).start()
+    print(f"Watching {folder} ({watcher.mode}), ^C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        watcher.stop()
@@ -1,31 +1,334 @@
 import sys
+import atexit
 import httpx
 import asyncio
+import importlib.util
 import json
+import os
+import random
+import re
+import threading
 import time
 import inspect
+from concurrent.futures import wait
+from urllib.parse import urlsplit
 
 from pymirror.pmlogger import _debug, _print, _error, trace
 from pymirror.utils import SafeNamespace
 from pymirror.pmlogger import pmlogger, PMLoggerLevel
 from pymirror.pmcaches import FileCache
+from pymirror.pmioloop import PMIOLoop
 
 # pmlogger.set_level(PMLoggerLevel.DEBUG)
 
+## one pooled AsyncClient per event loop, shared by every PMWebApi (keep-alive, no handshake per fetch)
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY_SECS = 60
+MAX_CONNECTIONS_PER_HOST = 4
+
+MIN_MAX_AGE_SECS = 60  # don't let a tiny Cache-Control max-age turn into a fetch every frame
+
+_clients = {}  # event loop -> httpx.AsyncClient
+_host_limits = {}  # (event loop, host) -> asyncio.Semaphore
+_clients_lock = threading.Lock()
+
+def get_http_client(loop: asyncio.AbstractEventLoop) -> httpx.AsyncClient:
+    """ The shared client for loop (clients can't be shared between event loops) """
+    with _clients_lock:
+        client = _clients.get(loop)
+        if client is None or client.is_closed:
+            ## HTTP/2 needs the optional h2 package (pip install httpx[http2])
+            http2 = importlib.util.find_spec("h2") is not None
+            client = _clients[loop] = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY_SECS,
+                ),
+                http2=http2,
+                follow_redirects=True,
+            )
+            _debug(f"Created the shared HTTP client (http2={http2})")
+        return client
+
+def _host_limit(loop: asyncio.AbstractEventLoop, url: str) -> asyncio.Semaphore:
+    """ httpx only limits the whole pool, this limits the connections to one host """
+    key = (loop, urlsplit(url).netloc)
+    with _clients_lock:
+        semaphore = _host_limits.get(key)
+        if semaphore is None:
+            semaphore = _host_limits[key] = asyncio.Semaphore(MAX_CONNECTIONS_PER_HOST)
+        return semaphore
+
+def close_http_clients() -> None:
+    """ Close the shared clients (and their connections), called at exit """
+    with _clients_lock:
+        clients = list(_clients.items())
+        _clients.clear()
+        _host_limits.clear()
+    for loop, client in clients:
+        try:
+            if loop.is_closed():
+                continue
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=5)
+            else:
+                loop.run_until_complete(client.aclose())
+        except Exception as e:
+            _debug(f"Error closing the shared HTTP client: {e}")
+
+atexit.register(close_http_clients)
+
+## failing hosts are retried with exponential backoff (plus jitter, so apis don't retry in lockstep),
+## after BREAKER_FAILURES failures in a row the breaker opens and nothing is sent for BREAKER_OPEN_SECS,
+## then one trial fetch decides whether it closes again
+BACKOFF_BASE_SECS = 2
+BACKOFF_MAX_SECS = 15 * 60
+BREAKER_FAILURES = 5
+BREAKER_OPEN_SECS = 5 * 60
+
+def _backoff_secs(failures: int) -> float:
+    """ Exponential backoff with jitter after failures in a row """
+    delay = min(BACKOFF_MAX_SECS, BACKOFF_BASE_SECS * 2 ** (failures - 1))
+    return random.uniform(delay / 2, delay)
+
+class HostBreaker:
+    def __init__(self, host: str):
+        self.host = host
+        self.failures = 0  # in a row
+        self.retry_at = 0.0  # no fetches before this time.time()
+        self.trial = False  # the breaker's trial fetch is out
+        self.last_error = None
+        self.total_failures = 0
+        self.total_successes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.failures < BREAKER_FAILURES:
+            return "closed"
+        return "half_open" if self.trial or time.time() >= self.retry_at else "open"
+
+    def allow(self) -> bool:
+        """ True if a fetch may go out now """
+        with self._lock:
+            if time.time() < self.retry_at or self.trial:
+                return False
+            if self.failures >= BREAKER_FAILURES:
+                self.trial = True  # only one fetch until it closes again
+            return True
+
+    def retry_in_secs(self) -> float:
+        return max(0.0, self.retry_at - time.time())
+
+    def success(self) -> None:
+        with self._lock:
+            if self.failures >= BREAKER_FAILURES:
+                _print(f"{self.host} is back, closing its breaker")
+            self.failures = 0
+            self.retry_at = 0.0
+            self.trial = False
+            self.total_successes += 1
+
+    def failure(self, error, retry_after_secs: float = 0) -> None:
+        with self._lock:
+            self.failures += 1
+            self.total_failures += 1
+            self.last_error = str(error)
+            self.trial = False
+            if self.failures >= BREAKER_FAILURES:
+                delay = random.uniform(BREAKER_OPEN_SECS / 2, BREAKER_OPEN_SECS)
+                if self.failures == BREAKER_FAILURES:
+                    _error(f"{self.host} failed {self.failures} times, opening its breaker ({error})")
+            else:
+                delay = _backoff_secs(self.failures)
+            delay = max(delay, retry_after_secs)
+            self.retry_at = time.time() + delay
+            _debug(f"{self.host} failed ({error}), next try in {delay:.1f}s")
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "retry_in_secs": round(self.retry_in_secs(), 1),
+            "last_error": self.last_error,
+            "total_failures": self.total_failures,
+            "total_successes": self.total_successes,
+        }
+
+_breakers = {}  # host -> HostBreaker
+
+def get_breaker(url: str) -> HostBreaker:
+    host = urlsplit(url).netloc
+    with _clients_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = HostBreaker(host)
+        return breaker
+
+def breaker_stats() -> dict:
+    """ host -> breaker state, for /metrics """
+    with _clients_lock:
+        breakers = list(_breakers.values())
+    return {breaker.host: breaker.stats() for breaker in breakers}
+
+def _retry_after_secs(response) -> float:
+    try:
+        return float(response.headers.get("retry-after", 0))
+    except ValueError:
+        return 0  # an HTTP date, just use the backoff
+
+##
+## json paths pick the parts of a payload a caller needs, eg: "articles[*].title", "current.temp", "daily[0].summary"
+## the result keeps the payload's shape with everything else left out, so templates like
+## {{ payload.articles[_n_].title }} work the same on the full and the selected payload
+##
+
+def parse_json_path(path: str) -> list:
+    """ "articles[*].title" -> ["articles", "*", "title"] """
+    steps = []
+    for part in re.findall(r"\[[^\]]*\]|[^.\[\]]+", path):
+        if part.startswith("["):
+            part = part[1:-1].strip()
+            steps.append("*" if part == "*" else int(part))
+        else:
+            steps.append(part)
+    return steps
+
+def _prune(value, steps: list):
+    """ value with only the path in steps left (missing parts are None, list items keep their place) """
+    if not steps:
+        return value
+    step, rest = steps[0], steps[1:]
+    if step == "*":
+        return [_prune(item, rest) for item in value] if isinstance(value, list) else None
+    if isinstance(step, int):
+        if not isinstance(value, list) or not 0 <= step < len(value):
+            return None
+        return [None] * step + [_prune(value[step], rest)]
+    if not isinstance(value, dict) or step not in value:
+        return None
+    return {step: _prune(value[step], rest)}
+
+def _merge(a, b):
+    if isinstance(a, dict) and isinstance(b, dict):
+        for key, value in b.items():
+            a[key] = _merge(a.get(key), value)
+        return a
+    if isinstance(a, list) and isinstance(b, list):
+        return [_merge(x, y) for x, y in zip(a, b)] + a[len(b):] + b[len(a):]
+    return b if a is None else a
+
+def select_json(data, paths: list[str]):
+    """ data with only paths left in it """
+    result = None
+    for path in paths:
+        result = _merge(result, _prune(data, parse_json_path(path)))
+    return result
+
+def _nest(steps: list, value):
+    for step in reversed(steps):
+        value = {step: value}
+    return value
+
+def load_json(fname: str, paths: list[str] = None):
+    """ Parse a json file, only keeping paths (all of it when None)
+    With ijson installed the file is parsed incrementally, one "[*]" item at a time,
+    so only the selected parts of a large payload are ever held in memory.
+    """
+    try:
+        import ijson  # optional, pip install ijson
+    except ImportError:
+        ijson = None
+    if not paths or ijson is None:
+        with open(fname, "rb") as f:
+            data = json.load(f)
+        return select_json(data, paths) if paths else data
+    ## group the paths by the keys before their first "[*]", each group is one pass over the file
+    groups = {}
+    slow_paths = []  # ijson prefixes can't index into lists, these are parsed the slow way
+    for path in paths:
+        steps = parse_json_path(path)
+        split = steps.index("*") if "*" in steps else len(steps)
+        prefix, rest = tuple(steps[:split]), steps[split + 1:] if split < len(steps) else None
+        if not prefix or not all(isinstance(step, str) for step in prefix):
+            slow_paths.append(path)
+            continue
+        groups.setdefault(prefix, []).append(rest)
+    result = None
+    if slow_paths:
+        with open(fname, "rb") as f:
+            result = select_json(json.load(f), slow_paths)
+    for prefix, rests in groups.items():
+        with open(fname, "rb") as f:
+            if rests[0] is None:
+                ## no "[*]", just the value at prefix
+                value = next(ijson.items(f, ".".join(prefix), use_float=True), None)
+            else:
+                value = []
+                for item in ijson.items(f, ".".join(prefix) + ".item", use_float=True):
+                    pruned = None
+                    for rest in rests:
+                        pruned = _merge(pruned, _prune(item, rest))
+                    value.append(pruned)
+        if value is not None:
+            result = _merge(result, _nest(list(prefix), value))
+    return result
+
+def _is_host_failure(response) -> bool:
+    """ No response at all, rate-limited or a server error, other failures are the request's fault """
+    return response is None or response.status_code == 429 or response.status_code >= 500
+
+_in_flight = {}  # request -> Future, shared by every PMWebApi making the same request
+_in_flight_lock = threading.Lock()
+
+def _finished(key: str, url: str, future) -> None:
+    """ Once per fetch, however many apis share it: forget it and tell the host's breaker how it went """
+    with _in_flight_lock:
+        if _in_flight.get(key) is future:
+            del _in_flight[key]
+    breaker = get_breaker(url)
+    if future.cancelled():
+        return
+    if future.exception():
+        breaker.failure(future.exception())
+        return
+    response = future.result()
+    if _is_host_failure(response):
+        breaker.failure(f"HTTP {response.status_code}", _retry_after_secs(response))
+    else:
+        breaker.success()  # the host answered, other 4xx errors are the request's fault
+
 # @trace
 class PMWebApi:
-    def __init__(self, url: str, poll_secs: int = 3600, cache_file: str = None):
+    def __init__(self, url: str, poll_secs: int = 3600, cache_file: str = None, stream: bool = False):
         self.url = url
+        self.base_url = url  # get_json() appends a resource id to it
         self.poll_secs = poll_secs
-        ##
-        self.async_loop = asyncio.get_event_loop()
+        ## fetches run on the shared I/O thread, self.task is a concurrent.futures.Future
+        self.io_loop = PMIOLoop.get()
         self.task = None
+        self.on_done = None  # on_done(api) is called on the I/O thread when a fetch finishes
+        self.subscribers = []  # called with the api when fresh data arrives
+        self._lock = threading.RLock()  # fetches are picked up on the I/O thread or the caller's
         self.file_cache = FileCache(text=None, fname=cache_file, timeout_ms=poll_secs * 1000) if cache_file else None
-        self.async_delay = 0.01
+        ## response validators (ETag, Last-Modified, max-age) are kept next to the cached body
+        self.validators = self._read_validators()
+        if self.validators.get("max_age"):
+            self.file_cache.timeout_ms = self.validators["max_age"] * 1000
         self.httpx = self.set_httpx()
         self.error = None
         self.from_cache = False
         self.text = None
+        ## stream: the response body is written straight to the cache file and
+        ## fetch_json() parses it from there, the text is never held in memory
+        self.stream = stream and self.file_cache is not None
+        self._parsed = None
+        ## this api's own backoff, for failures that aren't the host's fault (eg: a 401 from a bad key)
+        self.failures = 0
+        self._retry_at = 0.0
+        self._parsed_key = None  # (mtime, size, paths) of self._parsed
 
     def set_httpx(self, method="get", headers={"Accept": "application/json"}, params={}, data=None, json=None, timeout_secs=5):
         httpx = SafeNamespace()
@@ -37,6 +340,60 @@ class PMWebApi:
         httpx.timeout_secs = timeout_secs
         return httpx
 
+    def _meta_fname(self) -> str:
+        return self.file_cache.file_info.fname + ".meta"
+
+    def _read_validators(self) -> dict:
+        if not self.file_cache: return {}
+        try:
+            with open(self._meta_fname(), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_validators(self, response) -> None:
+        """ Remember the response's validators and max-age for the next refresh """
+        if not self.file_cache: return
+        validators = {}
+        if response.headers.get("etag"):
+            validators["etag"] = response.headers["etag"]
+        if response.headers.get("last-modified"):
+            validators["last_modified"] = response.headers["last-modified"]
+        match = re.search(r"max-age=(\d+)", response.headers.get("cache-control", ""))
+        if match:
+            validators["max_age"] = max(int(match.group(1)), MIN_MAX_AGE_SECS)
+        ## the cache lifetime follows the server, poll_secs when it doesn't say
+        self.file_cache.timeout_ms = validators.get("max_age", self.poll_secs) * 1000
+        self.validators = validators
+        try:
+            with open(self._meta_fname(), "w") as f:
+                json.dump(validators, f)
+        except OSError as e:
+            _error(f"Error saving validators for {self.url}: {e}")
+
+    def _conditional_headers(self) -> dict:
+        """ If-None-Match / If-Modified-Since, only when there's a cached body to fall back on """
+        headers = {}
+        if not self.file_cache or not os.path.getsize(self.file_cache.file_info.fname):
+            return headers
+        if self.validators.get("etag"):
+            headers["If-None-Match"] = self.validators["etag"]
+        if self.validators.get("last_modified"):
+            headers["If-Modified-Since"] = self.validators["last_modified"]
+        return headers
+
+    def _renew_cache(self) -> str | None:
+        """ 304 Not Modified (or the same body): the cached body is still good, restart its lifetime """
+        file_info = self.file_cache.file_info
+        _debug(f"{self.url} not modified, renewing {file_info.fname}")
+        os.utime(file_info.fname)
+        if self.stream:
+            file_info.update_stats()
+            return None
+        text = self.file_cache.read()
+        self.file_cache.text = text  # so fetch_text() doesn't rewrite the same body
+        return text
+
     @property
     def last_date(self):
         return self.file_cache.file_info.last_date 
@@ -44,127 +401,230 @@ class PMWebApi:
     def is_from_cache(self):
         return self.from_cache
 
-    def start(self): 
-        self.task = self.async_loop.create_task(self._async_fetch())
+    def subscribe(self, callback) -> None:
+        """ callback(api) is called when fresh data arrives (usually on the I/O thread, so just flag it and pm.wakeup) """
+        self.subscribers.append(callback)
+
+    def _request(self) -> dict:
+        method = self.httpx.method.upper()
+        return {
+            "method": method,
+            "url": self.url,
+            "headers": {**self.httpx.headers, **self._conditional_headers()},
+            "params": self.httpx.params,
+            "data": self.httpx.data if method != "GET" else None,
+            "json": self.httpx.json if method != "GET" else None,
+            "timeout": self.httpx.timeout_secs,
+            "stream_to": self.file_cache.file_info.fname if self.stream else None,
+        }
+
+    def start(self):
+        ## identical requests (same url, params, body and validators) share one fetch
+        request = self._request()
+        url = request["url"]
+        key = json.dumps(request, sort_keys=True, default=str)
+        with _in_flight_lock:
+            future = _in_flight.get(key)
+            if future is None or future.done():
+                future = _in_flight[key] = self.io_loop.submit(self._async_fetch(request), on_done=lambda future: _finished(key, url, future))
+            else:
+                _debug(f"Joining the fetch in flight for {self.url}")
+        self.task = future
+        future.add_done_callback(self._fetch_done)
+
+    def _fetch_done(self, future) -> None:
+        self._accept(future)
+        if self.on_done:
+            self.on_done(self)
+
+    def retry_in_secs(self) -> float:
+        """ How long until the api is tried again (0 if it's not backing off) """
+        return max(self._retry_at - time.time(), get_breaker(self.url).retry_in_secs(), 0.0)
+
+    def is_pending(self) -> bool:
+        """ True while a fetch is running on the I/O thread """
+        return self.task is not None and not self.task.done()
 
     def cancel(self):
-        if self.task:
-            self.task.cancel()
+        ## the fetch may be shared with other apis, so let it finish and just forget about it
+        self.task = None
+
+    def _accept(self, future) -> bool:
+        """ Pick up a finished fetch (once), returns True if it brought fresh text """
+        with self._lock:
+            if future is not self.task:
+                return False  # already picked up, or cancelled
             self.task = None
+            self.error = None
+            response = None
+            try:
+                response = future.result()
+                text = self._read_response(response)
+            except Exception as e:
+                text = None
+                self.error = e
+            if self.error:
+                if _is_host_failure(response):
+                    ## the host's breaker backs off (see _finished)
+                    _error(f"Error fetching API response from {self.url}: {self.error}")
+                else:
+                    self.failures += 1
+                    delay = _backoff_secs(self.failures)
+                    self._retry_at = time.time() + delay
+                    _error(f"Error fetching API response from {self.url}: {self.error} (retrying in {delay:.0f}s)")
+                return False
+            self.failures = 0
+            self._retry_at = 0.0
+            _debug(f" |  | API response from {self.url} is non-null")
+            if self.stream:
+                ## the body is already in the cache file
+                self.file_cache.file_info.update_stats()
+                self.file_cache.invalidate()
+                self.text = None
+            else:
+                if text != self.text:
+                    self.file_cache.set(text)
+                self.text = text
+            self.from_cache = False
+        for callback in self.subscribers:
+            try:
+                callback(self)
+            except Exception as e:
+                _error(f"Subscriber {callback} of {self.url} failed: {e}")
+        return True
 
-    def fetch(self, blocking=True):
-        try:
-            return self._fetch_blocking(blocking) \
-                or self._fetch_non_blocking(blocking)
-        except Exception as e:
-            self.cancel()
-            self.error = e
+    def _read_response(self, response) -> str | None:
+        _debug(f"Response status code: {response.status_code}")
+        if response.status_code == 200:
+            self._save_validators(response)
+            if self.stream:
+                return None
+            if response.text == self.text and self.file_cache:
+                return self._renew_cache()
+            return response.text
+        if response.status_code == 304 and self.file_cache:
+            return self._renew_cache()
+        self.error = Exception(f"HTTP {response.status_code}: {response.text}")
+        return None
 
     def fetch_text(self, blocking=True):
-        cached_text = self.file_cache.get()
-        if cached_text != None:
-            _debug(f" | Cached file {self.file_cache.file_info.fname} is valid")
-            self.from_cache = True
-            self.text = cached_text
-        else:
+        """ The cached text while it's valid, once it expires the stale text is returned
+        while a refresh runs in the background (blocking only waits when there's no text at all) """
+        with self._lock:
+            if self.task is not None and self.task.done():
+                self._accept(self.task)
+            cached_text = self.file_cache.get()
+            if cached_text != None:
+                _debug(f" | Cached file {self.file_cache.file_info.fname} is valid")
+                if cached_text is not self.text:
+                    self.from_cache = True  # loaded from the file, not the last fetch
+                self.text = cached_text
+                return self.text
             _debug(f" | Cached file {self.file_cache.file_info.fname} is invalid / timed out")
-            api_text = self._fetch_from_api(blocking)
-            if api_text != None:
-                _debug(f" |  | API response from {self.url} is non-null")
-                self.text = api_text
-                self.from_cache = False
-                ## update the cache if the text has changed
-                self.file_cache.update(self.text)
-            else:
-                ## api returned nothing - error or non-blocking read
-                _debug(f" |  | API response from {self.url} is null (non-blocking or error)")
-                if self.error:
-                    _error(f"Error fetching API response from {self.url}: {self.error}")
-                    self.text = None
-                    self.from_cache = False
-                else:
-                    if self.text == None:
-                        ## the cache is invalid, try to read from file
-                        _debug(f" |  |  | HARD-Loading cache from file {self.file_cache.file_info.fname}")
-                        self.text = self.file_cache.read()
-                        self.from_cache = True
-                    else:
-                        ## the api returned nothing, keep using the old text
-                        _debug(f" |  |  | the api returned nothing, keep using the old text")
-                        self.from_cache = True
-                        pass
+            if self.text == None:
+                _debug(f" |  | HARD-Loading cache from file {self.file_cache.file_info.fname}")
+                self.text = self.file_cache.read()
+            ## serve the stale body until the refresh arrives
+            self.from_cache = True
+            self._refresh(has_body=self.text != None)
+            task = self.task if blocking and self.text == None else None
+        if task is not None:
+            _debug(f"Blocking fetch from {self.url} with method {self.httpx.method}")
+            wait([task])
+            self._accept(task)
         return self.text
 
-    def fetch_json(self, blocking=True):
+    def _refresh(self, has_body: bool) -> None:
+        """ Start a fetch for the expired cache, unless one is running or the host is backing off """
+        if self.task is not None:
+            return
+        if time.time() < self._retry_at:
+            _debug(f" |  | {self.url} failed {self.failures} times, retrying in {self.retry_in_secs():.1f}s")
+            if not has_body:
+                self.error = Exception(f"{self.url} failed, retrying in {self.retry_in_secs():.0f}s")
+            return
+        breaker = get_breaker(self.url)
+        if breaker.allow():
+            self.start()
+            return
+        ## backing off, the stale body (if any) is all there is
+        _debug(f" |  | {breaker.host} is {breaker.state}, retrying in {breaker.retry_in_secs():.1f}s")
+        if not has_body:
+            self.error = Exception(f"{breaker.host} is unavailable, retrying in {breaker.retry_in_secs():.0f}s ({breaker.last_error})")
+
+    def fetch_json(self, blocking=True, paths: list[str] = None):
+        """ The parsed json, only paths when given (eg: ["articles[*].title", "totalResults"]) """
         result = None
         try:
             _debug(f"Fetching json from {self.url}...")
+            if self.stream:
+                return self._fetch_json_file(blocking, paths)
             text = self.fetch_text(blocking=blocking)
             if text:
                 result = json.loads(text)
+                if paths:
+                    result = select_json(result, paths)
         except Exception as e:
             self.error = e
         return result
 
-    def _fetch_blocking(self, blocking):
-        if not blocking:
+    def _fetch_json_file(self, blocking, paths):
+        """ fetch_json() for stream apis, parsed from the cache file """
+        file_info = self.file_cache.file_info
+        with self._lock:
+            if self.task is not None and self.task.done():
+                self._accept(self.task)
+            file_info.update_stats()
+            if not file_info.size or file_info.is_expired(self.file_cache.timeout_ms):
+                self.from_cache = True  # serve the stale body until the refresh arrives
+                self._refresh(has_body=file_info.size > 0)
+            task = self.task if blocking and not file_info.size else None
+        if task is not None:
+            wait([task])
+            self._accept(task)
+            file_info.update_stats()
+        if not file_info.size:
             return None
-        _debug(f"Blocking fetch from {self.url} with method {self.httpx.method}")
-        self.start()
-        self.async_loop.run_until_complete(self.task)
-        result = self.task.result()
-        self.error = None ## GLS - resetting error (set because file not found or out of date)
-        self.cancel()
-        return result
+        key = (file_info.last_modified, file_info.size, tuple(paths or ()))
+        if key != self._parsed_key:
+            self._parsed = load_json(file_info.fname, paths)
+            self._parsed_key = key
+        return self._parsed
 
-    def _fetch_non_blocking(self, blocking):
-        if blocking:
-            return None
-        _debug(f"Non-blocking fetch from {self.url} with method {self.httpx.method}")
-        if self.task is None:
-            self.start()
-        ## give asyncio some time to process
-        self.async_loop.run_until_complete(asyncio.sleep(self.async_delay))
-        if not self.task.done():
-            _debug(f"Fetch task NOT completed for {self.url}")
-            self.error = None ## GLS - resetting error (set because file not found or out of date)
-            return None
-        _debug(f"Fetch task completed for {self.url}")
-        result = self.task.result()
-        self.cancel()
-        return result
+    def get_json(self, params: dict = None, blocking=False):
+        """ fetch_json() with query params, a "_resource_id" param is appended to the url path """
+        params = dict(params or {})
+        resource_id = params.pop("_resource_id", None)
+        if resource_id is not None:
+            self.url = f"{self.base_url.rstrip('/')}/{resource_id}"
+        self.httpx.params = params
+        return self.fetch_json(blocking=blocking)
 
-    def _fetch_from_api(self, blocking=True):
-        text = None
-        self.error = None
-        response = self.fetch(blocking=blocking)
-        _debug(f"Fetch response from {self.url}: {response}")
-        if not response:
-            return None
-        _debug(f"Response status code: {response.status_code}")
-        if response.status_code == 200:
-            text = response.text
-        else:
-            self.error = Exception(f"HTTP {response.status_code}: {response.text}")
-        return text
-    
-    async def _async_fetch(self):
-        async with httpx.AsyncClient(timeout=self.httpx.timeout_secs) as client:
-            method = self.httpx.method.upper()
-            _debug(f"Fetching {self.url} with method {method}...")
-            # Select the method dynamically
-            _debug(f"...headers: {self.httpx.headers}, params: {self.httpx.params}")
-            response = await client.request(
-                method,
-                self.url,
-                headers=self.httpx.headers,
-                params=self.httpx.params,
-                data=self.httpx.data if method != "GET" else None,
-                json=self.httpx.json if method != "GET" else None,
-                follow_redirects=True
-            )
-            _debug(f"Received response from {self.url} with status code {response.status_code}")
-            return response
+    async def _async_fetch(self, request: dict):
+        loop = asyncio.get_running_loop()
+        client = get_http_client(loop)
+        request = dict(request)
+        url = request.pop("url")
+        method = request.pop("method")
+        stream_to = request.pop("stream_to")
+        _debug(f"Fetching {url} with method {method}...")
+        _debug(f"...headers: {request['headers']}, params: {request['params']}")
+        async with _host_limit(loop, url):
+            if not stream_to:
+                response = await client.request(method, url, **request)
+            else:
+                async with client.stream(method, url, **request) as response:
+                    if response.status_code == 200:
+                        ## chunks go straight to disk, the cache file is replaced once the body is complete
+                        part = stream_to + ".part"
+                        with open(part, "wb") as f:
+                            async for chunk in response.aiter_bytes():
+                                f.write(chunk)
+                        os.replace(part, stream_to)
+                    else:
+                        await response.aread()
+        _debug(f"Received response from {url} with status code {response.status_code}")
+        return response
 
 def main():
     import dotenv
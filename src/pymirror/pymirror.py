@@ -8,13 +8,25 @@ from dotenv import load_dotenv
 import queue
 import argparse
 import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
 
 from pymirror.pmlogger import trace, _debug, _info, _warning, _error, _critical, _trace
 from pymirror.pmscreen import PMScreen
+from pymirror.pmrect import PMRect
+from pymirror.pmprofiler import PMProfiler, PROFILER_FRAMES
+from pymirror.pmioloop import PMIOLoop
+from pymirror.pmwebapi import breaker_stats
+from pmgfxlib.pmtextcache import TEXT_CACHE
 from pymirror.utils import snake_to_pascal, expand_dict, SafeNamespace
 from pmserver.pmserver import PMServer
 from events import * # get all events 
 
+MIN_SLEEP_SECS = 0.01  # gives pmserver a chance to process web requests
+MAX_SLEEP_SECS = 1.0
+EXEC_THREADS = 4  # worker threads for modules with a blocking exec()
+
+_WAKEUP = object()  # queued by wakeup() to end the main loop's sleep
+
 def _to_null(s):
     """ Convert a string to None if it is 'null' or 'None' """
     if s in ["null", "None"]:
@@ -36,14 +48,40 @@ class PyMirror:
         self.screen = PMScreen(self._config.screen)
         self.force_render = False
         self.debug = self._config.debug
+        ## the longest the main loop sleeps when no module has a deadline
+        self.max_sleep_secs = self._config.max_sleep_secs or MAX_SLEEP_SECS
+        ## modules that are left over when rendering takes longer than this are deferred to the next frame
+        self.frame_budget_secs = (self._config.frame_budget_ms or 0) / 1000
+        self._deferred = []  # changed modules that have not been rendered yet
+        ## blocking modules exec() on worker threads, the main loop picks up the results
+        self._executor = None  # created when the first blocking module runs
+        self._in_flight = {}  # module -> Future of its exec()
+        self._held_events = {}  # module -> events that arrived while its exec() was running
+        self._needs_exec = set()  # blocking modules that got events since their last exec()
+        ## render changed modules in parallel (Pillow releases the GIL while drawing), 1 = render in the main loop
+        self.render_threads = self._config.render_threads or 1
+        self._render_executor = None
         self.modules = []
         self.events = []
         self.server_queue = queue.Queue()  # Use a queue to manage events
-        self.server = PMServer(self._config.server, self.server_queue)
-        self._clear_screen = True  # Flag to clear the screen on each loop
+        if self._config.text_cache_mb:
+            TEXT_CACHE.max_bytes = int(self._config.text_cache_mb * 1024 * 1024)
+        self.profiler = PMProfiler(self._config.profiler_frames or PROFILER_FRAMES)
+        self.server = PMServer(self._config.server, self.server_queue, metrics=self._metrics)
+        self._clear_screen = True  # Flag to recompose the whole screen on the next loop
+        self._damage = []  # screen rects that need recomposing (see _update_screen)
+        ## network fetches run on the I/O thread, wake up when one finishes so its module can pick it up
+        PMIOLoop.get().add_listener(lambda future: self.wakeup())
         self._load_modules()
         self.server.start()  # Start the server to handle incoming events
 
+    def _metrics(self) -> dict:
+        """ Served as JSON on the PMServer /metrics route """
+        metrics = self.profiler.summary()
+        metrics["text_cache"] = TEXT_CACHE.stats()
+        metrics["web_apis"] = breaker_stats()
+        return metrics
+
     def _load_config(self, config_fname) -> SafeNamespace:
         # read .env file if it exists
         load_dotenv()
@@ -100,6 +138,7 @@ class PyMirror:
         ## add any messages that have come from the web server
         try:
             while event := self.server_queue.get(0):
+                if event is _WAKEUP: continue
                 _debug(f"Received event from server: {event}")
                 self.publish_event(event)
         except queue.Empty:
@@ -110,13 +149,19 @@ class PyMirror:
     def _send_events_to_module(self, module, events):
         if not module.subscriptions: 
             return
+        if module in self._in_flight:
+            ## don't touch the module's state while exec() runs, deliver the events when it's done
+            self._held_events.setdefault(module, []).extend(events)
+            return
         for event in events:
             if event.event in module.subscriptions:
                 module.onEvent(event)
+                if module.blocking:
+                    self._needs_exec.add(module)
 
     def _convert_events_to_namespace(self):
         """ Convert a list of events to SafeNamespace objects """
-        return [SafeNamespace(event) if isinstance(event, dict) else event for event in self.events]
+        return [SafeNamespace(**event) if type(event) is dict else event for event in self.events]
 
     def _send_all_events(self):
         if not self.events: return
@@ -125,6 +170,10 @@ class PyMirror:
             self._send_events_to_module(module, self.events)  # Send all events to the module
         self.events.clear()  # Clear the events after sending them
 
+    def wakeup(self):
+        """ End the main loop's sleep early (safe to call from any thread) """
+        self.server_queue.put(_WAKEUP)
+
     def publish_event(self, event: dict):
         if type(event) is dict:
             self.events.append(SafeNamespace(**event))
@@ -150,58 +199,231 @@ class PyMirror:
     def full_render(self):
         self.screen.bitmap.clear()
         for module in self.modules:
-            if module.disabled or not module.bitmap: continue
-            module.render(force=True)
+            module._visible = (not module.disabled) and module.bitmap is not None
+            if not module._visible: continue
+            if module not in self._in_flight:
+                module.render(force=True)
             self.screen.bitmap.paste(module.bitmap, module.bitmap.x0, module.bitmap.y0, mask=module.bitmap)
         if self.debug: self._debug(module)
+        self._damage.clear()
         self.screen.flush()  # Flush the screen to show all modules at once
 
+    def _is_frame_capped(self, module, now: float) -> bool:
+        """ True if the module ran less than 1/max_fps seconds ago """
+        return bool(module.max_fps) and now - module._last_exec < 1.0 / module.max_fps
+
+    def _submit_exec(self, module, now: float):
+        """ Start a blocking module's exec() on a worker thread """
+        if module not in self._needs_exec:
+            wakeup = module.next_wakeup()
+            if wakeup is None or wakeup > now:
+                return  # nothing for the module to do yet (None = it only changes on events)
+        self._needs_exec.discard(module)
+        if not self._executor:
+            self._executor = ThreadPoolExecutor(max_workers=self._config.exec_threads or EXEC_THREADS, thread_name_prefix="pm-exec")
+        module._last_exec = now
+        future = self._executor.submit(self._timed_exec, module)
+        future.add_done_callback(lambda future: self.wakeup())
+        self._in_flight[module] = future
+
+    def _timed_exec(self, module):
+        """ returns (state_changed, seconds taken by exec()) """
+        start_time = time.time()
+        state_changed = module.exec()
+        return state_changed, time.time() - start_time
+
+    def _collect_exec(self, module) -> bool:
+        """ Finish a blocking module's exec(), returns True if its state changed """
+        state_changed, exec_time = self._in_flight.pop(module).result()  # re-raises exceptions from exec()
+        module._time = exec_time
+        self.profiler.add_module(module.name, "exec", exec_time)
+        events = self._held_events.pop(module, None)
+        if events:
+            self._send_events_to_module(module, events)
+        return state_changed
+
     def _exec_modules(self):
         modules_changed = []
+        now = time.time()
         for module in self.modules:
+            if module in self._in_flight:
+                if not self._in_flight[module].done():
+                    continue  # still running, the module keeps its current bitmap
+                if self._collect_exec(module) or module.force_render:
+                    modules_changed.append(module)
+                continue
             if not module.disabled:
-                module._time = 0.0  # Reset the time for each module
+                if self._is_frame_capped(module, now): continue
+                if module.blocking:
+                    self._submit_exec(module, now)
+                    continue
+                module._last_exec = now
                 start_time = time.time()  # Start timing the module execution
                 state_changed = module.exec() # update module state (returns True if the state has changed)
                 end_time = time.time()  # End timing the module execution
+                module._time = end_time - start_time  # exec() time, render and composite times are added on
+                self.profiler.add_module(module.name, "exec", module._time)
                 if state_changed or module.force_render: 
                     modules_changed.append(module)
-                    module._time += end_time - start_time  # Calculate the time taken for module execution
         return modules_changed
 
+    def _render_module(self, module):
+        start_time = time.time()  # Start timing the module rendering
+        module.render(force=self.force_render)
+        end_time = time.time()  # End timing the module rendering
+        module._time += end_time - start_time  # add on the time taken for module rendering
+        self.profiler.add_module(module.name, "render", end_time - start_time)
+
+    def _render_parallel(self, modules):
+        """ Render the modules on the render thread pool and wait for all of them """
+        if not self._render_executor:
+            self._render_executor = ThreadPoolExecutor(max_workers=self.render_threads, thread_name_prefix="pm-render")
+        ## each module draws on its own bitmap, shared fonts are guarded by PMFont.lock
+        futures = [self._render_executor.submit(self._render_module, module) for module in modules]
+        wait(futures)
+        for future in futures:
+            future.result()  # re-raise exceptions from render()
+
     def _render_modules(self, modules_changed):
         """ Render all modules that have changed state """
+        ## highest priority first, modules deferred from the last frame go before new ones of the same priority
+        deferred = [module for module in self._deferred if module not in self._in_flight]
+        modules_changed = deferred + [module for module in modules_changed if module not in deferred]
+        modules_changed.sort(key=lambda module: -module.priority)
+        modules_changed = [module for module in modules_changed if (not module.disabled) and module.bitmap]
+        self._deferred = []
+        if self.render_threads > 1 and len(modules_changed) > 1:
+            ## the whole batch renders at once, so the frame budget doesn't apply
+            self._render_parallel(modules_changed)
+        else:
+            frame_start = time.time()
+            for n, module in enumerate(modules_changed):
+                if n and self.frame_budget_secs and time.time() - frame_start > self.frame_budget_secs:
+                    ## over budget, render the rest on the next frame
+                    self._deferred = modules_changed[n:]
+                    _debug(f"Frame over budget, deferring {[module.name for module in self._deferred]}")
+                    modules_changed = modules_changed[:n]
+                    break
+                self._render_module(module)
         for module in modules_changed:
-            if (not module.disabled) and module.bitmap:
-                start_time = time.time()  # Start timing the module rendering
-                module.render(force=self.force_render)
-                end_time = time.time()  # End timing the module rendering
-                if module._time:
-                    module._time += end_time - start_time  # add on the time taken for module rendering
+            self._damage.append(PMRect(*module.bitmap.rect))  # the module's screen area must be recomposed
 
-    def _update_screen(self):
-        self.screen.bitmap.clear()  # Clear the bitmap before rendering
+    def _damage_visibility_changes(self):
+        """ Damage the screen area of modules that were shown or hidden since the last composite """
+        for module in self.modules:
+            visible = (not module.disabled) and module.bitmap is not None
+            if visible != module._visible:
+                module._visible = visible
+                if module.bitmap:
+                    self._damage.append(PMRect(*module.bitmap.rect))
+
+    def _merge_damage(self, rects: list[PMRect]) -> list[PMRect]:
+        """ Clip the damaged rects to the screen and merge the overlapping ones """
+        screen_rect = self.screen.bitmap.rect
+        merged = []
+        for rect in rects:
+            rect = rect.intersection(screen_rect)
+            if not rect: continue
+            ## grow the rect until it no longer overlaps any merged rect
+            i = 0
+            while i < len(merged):
+                if rect.intersects(merged[i]):
+                    rect = rect.union(merged.pop(i))
+                    i = 0
+                else:
+                    i += 1
+            merged.append(rect)
+        return merged
+
+    def _compose_rect(self, rect: PMRect):
+        """ Recompose one screen region from the modules that overlap it """
+        sbm = self.screen.bitmap
+        sbm.clear(rect)
+        ## modules earlier in the list are on top, so paste them last
         for module in reversed(self.modules):
-            if (not module.disabled) and module.bitmap:
-                start_time = time.time()  # Start timing the module rendering
-                self.screen.bitmap.paste(module.bitmap, module.bitmap.x0, module.bitmap.y0, mask=module.bitmap)
-                end_time = time.time()  # End timing the module rendering
-                module._time += end_time - start_time  # add on the time taken for module rendering
-                if self.debug: self._debug(module) # draw boxes around each module if debug is enabled
-        self.screen.flush()
+            if module.disabled or not module.bitmap: continue
+            if not module.bitmap.rect.intersects(rect): continue
+            start_time = time.time()  # Start timing the module compositing
+            sbm.paste(module.bitmap, module.bitmap.x0, module.bitmap.y0, mask=module.bitmap, clip=rect)
+            end_time = time.time()  # End timing the module compositing
+            module._time += end_time - start_time  # add on the time taken for module compositing
+            self.profiler.add_module(module.name, "composite", end_time - start_time)
+
+    def _update_screen(self):
+        self._damage_visibility_changes()
+        if self._clear_screen or self.debug:
+            ## recompose everything (the debug overlay draws across module boundaries)
+            damage = [PMRect(*self.screen.bitmap.rect)]
+        else:
+            damage = self._merge_damage(self._damage)
+        self._damage.clear()
+        if not damage:
+            return  # nothing changed on-screen
+        with self.profiler.stage("composite"):
+            for rect in damage:
+                self._compose_rect(rect)
+            if self.debug:
+                for module in reversed(self.modules):
+                    if (not module.disabled) and module.bitmap:
+                        self._debug(module) # draw boxes around each module if debug is enabled
+        if self._clear_screen:
+            self._clear_screen = False
+            damage = None  # flush the whole screen
+        with self.profiler.stage("flush"):
+            self.screen.flush(damage)
+
+    def _next_deadline(self) -> float:
+        """ The earliest time that any module needs exec() (at most max_sleep_secs from now) """
+        now = time.time()
+        deadline = now + self.max_sleep_secs
+        for module in self.modules:
+            if module.disabled: continue
+            if module in self._in_flight: continue  # wakeup() is called when its exec() is done
+            if module in self._needs_exec: return now
+            wakeup = now if module.force_render else module.next_wakeup()
+            if wakeup is None: continue
+            if module.max_fps:
+                wakeup = max(wakeup, module._last_exec + 1.0 / module.max_fps)
+            if wakeup < deadline:
+                deadline = wakeup
+        return deadline
+
+    def _wait_for_next_deadline(self):
+        """ Sleep until the next module deadline, or until an event arrives from the server """
+        if self.events or self._deferred:
+            return  # deliver published events / render deferred modules right away
+        timeout = max(self._next_deadline() - time.time(), MIN_SLEEP_SECS)
+        try:
+            event = self.server_queue.get(timeout=timeout)
+        except queue.Empty:
+            return
+        if event is _WAKEUP: return
+        _debug(f"Received event from server: {event}")
+        self.publish_event(event)
 
     def run(self):
         try:
+            profiler = self.profiler
             while True:
-                self._read_server_queue() # read any new events from the server queue
-                self._send_all_events()  # send all new events to the modules
-                modules_changed = self._exec_modules() # update / check the state of all modules
-                self._render_modules(modules_changed)  # Render only the modules that changed state
-                self._update_screen()  # Update the screen with the rendered modules
-                time.sleep(0.01) # Sleep for a short time to give pmserver a chance to process web requests
+                profiler.begin_frame()
+                with profiler.stage("read_queue"):
+                    self._read_server_queue() # read any new events from the server queue
+                with profiler.stage("send_events"):
+                    self._send_all_events()  # send all new events to the modules
+                with profiler.stage("exec"):
+                    modules_changed = self._exec_modules() # update / check the state of all modules
+                with profiler.stage("render"):
+                    self._render_modules(modules_changed)  # Render only the modules that changed state
+                self._update_screen()  # Update the screen with the rendered modules (composite + flush stages)
+                profiler.end_frame()
+                self._wait_for_next_deadline() # Sleep until a module needs to run or an event arrives
         except Exception as e:
             traceback.print_exc()  # <-- This _debugs the full stack trace to stdout
             self._error_screen(e)  # Display the error on the screen
+        finally:
+            for executor in (self._executor, self._render_executor):
+                if executor:
+                    executor.shutdown(wait=False, cancel_futures=True)
 
     def _error_screen(self, e):
         """ Display an error screen with the exception details """
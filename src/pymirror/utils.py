@@ -2,6 +2,7 @@ import datetime
 import os
 import re
 import sys
+import threading
 from types import SimpleNamespace
 from jinja2 import Template, StrictUndefined, Environment, Undefined, DebugUndefined
 from .pmlogger import _debug
@@ -68,26 +69,183 @@ class _NoneProxy:
 _NONE_PROXY = _NoneProxy()
 
 
+def _wrap(value):
+    if isinstance(value, dict):
+        return SafeNamespace(**value)
+    if isinstance(value, list) and not isinstance(value, _SafeList):
+        return _SafeList(value)
+    return value
+
+
+def _unwrap(value):
+    """ value as plain dicts and lists, however much of it has been wrapped (for comparisons) """
+    if isinstance(value, SafeNamespace):
+        with _LAZY_LOCK:
+            items = [*value._lazy.items(), *_NAMESPACE_DICT.__get__(value).items()]
+        return {k: _unwrap(v) for k, v in items}
+    if isinstance(value, SimpleNamespace):
+        return {k: _unwrap(v) for k, v in vars(value).items()}
+    if isinstance(value, dict):
+        return {k: _unwrap(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_unwrap(v) for v in list.__iter__(value)]
+    return value
+
+
+## A list that wraps its dict (and list) items the first time they're read.
+## Comparisons and searches treat wrapped and raw items the same.
+class _SafeList(list):
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return _SafeList(self[i] for i in range(*index.indices(len(self))))
+        value = super().__getitem__(index)
+        if isinstance(value, (dict, list)) and not isinstance(value, _SafeList):
+            value = _wrap(value)
+            super().__setitem__(index, value)
+        return value
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __reversed__(self):
+        for i in range(len(self) - 1, -1, -1):
+            yield self[i]
+
+    def pop(self, index=-1):
+        value = self[index]
+        super().pop(index)
+        return value
+
+    def __eq__(self, other):
+        if not isinstance(other, list):
+            return NotImplemented
+        return _unwrap(self) == _unwrap(other)
+
+    def __ne__(self, other):
+        if not isinstance(other, list):
+            return NotImplemented
+        return _unwrap(self) != _unwrap(other)
+
+    __hash__ = None
+
+    def __contains__(self, item):
+        item = _unwrap(item)
+        return any(_unwrap(value) == item for value in list.__iter__(self))
+
+    def index(self, item, start=0, stop=sys.maxsize):
+        item = _unwrap(item)
+        for i in range(*slice(start, stop).indices(len(self))):
+            if _unwrap(list.__getitem__(self, i)) == item:
+                return i
+        raise ValueError(f"{item!r} is not in list")
+
+    def count(self, item):
+        item = _unwrap(item)
+        return sum(_unwrap(value) == item for value in list.__iter__(self))
+
+    def copy(self):
+        return _SafeList(list.__iter__(self))
+
+    def __add__(self, other):
+        return _SafeList([*list.__iter__(self), *other])
+
+    def __radd__(self, other):
+        return _SafeList([*other, *list.__iter__(self)])
+
+    def __mul__(self, n):
+        return _SafeList(list.__mul__(self, n))
+
+    __rmul__ = __mul__
+
+
+_NAMESPACE_DICT = SimpleNamespace.__dict__["__dict__"]  # the real instance dict, under SafeNamespace.__dict__
+_LAZY_LOCK = threading.Lock()  # modules read their config from worker threads
+
 ## This is a safe namespace class that returns None for any missing attributes.
+## Nested dicts and lists are kept as they are until they're first read, then wrapped
+## (and the wrapper kept), so a big config or API response only pays for the parts that are used.
+## Reading a plain attribute is a normal instance dict lookup.
+## Wrapping and reordering happen under _LAZY_LOCK, and a reader that misses a known
+## attribute waits on it, so another thread never sees _NONE_PROXY for a real value.
 class SafeNamespace(SimpleNamespace):
+    __slots__ = ("_lazy", "_keys")
+
     def __init__(self, **kwargs):
+        object.__setattr__(self, "_keys", dict.fromkeys(kwargs))  # attribute order, for __dict__
+        lazy = {}
         for k, v in kwargs.items():
-            if isinstance(v, dict):
-                kwargs[k] = SafeNamespace(**v)
-            elif isinstance(v, list):
-                kwargs[k] = [
-                    SafeNamespace(**i) if isinstance(i, dict) else i for i in v
-                ]
+            if isinstance(v, (dict, list)) and not isinstance(v, _SafeList):
+                lazy[k] = v
+        for k in lazy:
+            del kwargs[k]
+        object.__setattr__(self, "_lazy", lazy)
         super().__init__(**kwargs)
-        self.__dict__.update(kwargs)
 
     def __getattr__(self, name):
-        # Return _NONE_PROXY for missing attributes
-        return _NONE_PROXY
+        ## only called when name isn't in the instance dict
+        if name.startswith("__") and name.endswith("__"):
+            raise AttributeError(name)  # protocol lookups (copy, pickle...) must see what's really there
+        if name in SafeNamespace.__slots__ or name not in self._keys:
+            # Return _NONE_PROXY for missing attributes
+            return _NONE_PROXY
+        with _LAZY_LOCK:
+            d = _NAMESPACE_DICT.__get__(self)
+            if name in self._lazy and name not in d:
+                d[name] = _wrap(self._lazy[name])  # left in _lazy until __dict__ puts it in order
+            return d.get(name, _NONE_PROXY)  # or __dict__ was reordering it
 
     def __getitem__(self, name):
         return getattr(self, name, _NONE_PROXY)
 
+    def __setattr__(self, name, value):
+        with _LAZY_LOCK:
+            self._lazy.pop(name, None)
+            self._keys[name] = None
+            super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        with _LAZY_LOCK:
+            self._keys.pop(name, None)
+            if self._lazy.pop(name, None) is None or name in _NAMESPACE_DICT.__get__(self):
+                super().__delattr__(name)
+
+    @property
+    def __dict__(self):
+        ## callers expect every attribute, nested values as namespaces (eg: SomeConfig(**config.__dict__))
+        d = _NAMESPACE_DICT.__get__(self)
+        if self._lazy:
+            with _LAZY_LOCK:
+                lazy = self._lazy
+                if lazy:
+                    ## rebuild it in the order the attributes were given, not the order they were wrapped
+                    ordered = {name: d[name] if name in d else _wrap(lazy[name])
+                               for name in self._keys if name in d or name in lazy}
+                    ordered.update(d)
+                    d.clear()
+                    d.update(ordered)
+                    lazy.clear()
+        return d
+
+    def __repr__(self):
+        self.__dict__
+        return super().__repr__()
+
+    def __eq__(self, other):
+        if not isinstance(other, SimpleNamespace):
+            return NotImplemented
+        return _unwrap(self) == _unwrap(other)
+
+    def __ne__(self, other):
+        if not isinstance(other, SimpleNamespace):
+            return NotImplemented
+        return _unwrap(self) != _unwrap(other)
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (self.__class__, (), self.__dict__)
+
 
 def _add(t, d):
     """Increment each element of the tuple by the corresponding element in d."""